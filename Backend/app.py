@@ -1,5 +1,7 @@
 import os
 import sys
+import threading
+import time
 
 from flask import Flask, jsonify, request
 from flask_cors import CORS
@@ -14,35 +16,168 @@ sys.path.insert(0, os.path.join(BASE_DIR, "reasoning"))
 sys.path.insert(0, os.path.join(BASE_DIR, "generator"))
 
 from github_loader import load_github_repo
-from chunker import chunk_repo
-from embedder import create_embeddings
-from faiss_index import FaissIndex
-from retriever import Retriever
+from chunker import chunk_repo, latest_repo_temp_dir
+from embedder import MODEL_NAME, create_embeddings, embed_texts, warm_up as warm_up_embedder
+from model_registry import model_fingerprint
+from query_batcher import query_batcher_stats
+from faiss_index import FaissIndex, calibration_questions
+from sharded_index import SHARD_STRATEGIES, ShardedFaissIndex
+from index_factory import INDEX_TYPES, METRICS
+from reduction import REDUCTION_METHODS
+from code_search import CODE_SEARCH_MAX_RESULTS, CodeIndexMissingError, CodeSearchIndex
+from index_catalog import IndexCatalog, UnknownRepoError, repo_key
+from search_filters import merge_filters, normalize_filters, parse_filter_query
+from retriever import HYBRID_CANDIDATES, HYBRID_SEARCH, Retriever, query_cache_stats
+from reranker import RERANK, RERANK_CANDIDATES, RERANK_MODEL, reranker_stats, warm_up as warm_up_reranker
+from diversity import MMR, MMR_CANDIDATES, MMR_LAMBDA, MMR_MAX_PER_FILE
+from expansion import EXPAND_MAX_RADIUS, EXPAND_TOKENS
+from answer_cache import ANSWER_CACHE, AnswerCache, answer_key, config_fingerprint
+from semantic_cache import SEMANTIC_CACHE, SemanticAnswerCache, chunk_set_key
 from query_decomposer import QueryDecomposer
-from overview_signals import extract_overview_signals
+from retrieval_planner import RetrievalPlanner
+from overview_signals import build_repo_profile, extract_overview_signals
 from safety_check import SafetyCheck
+import prompt_builder
 from prompt_builder import build_prompt
-from answer_generator import AnswerGenerator
+from answer_generator import GENERATOR_MODEL, AnswerGenerator
 
 
-FAISS_INDEX_PATH = os.path.join(BASE_DIR, "data", "vector_store", "index.faiss")
+VECTOR_STORE_DIR = os.path.join(BASE_DIR, "data", "vector_store")
+FAISS_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "index.faiss")
 API_PORT = int(os.getenv("PORT", "5001"))
 DEBUG_MODE = os.getenv("FLASK_DEBUG", "false").lower() == "true"
+INDEX_REDUCE_DIM = int(os.getenv("INDEX_REDUCE_DIM", "0")) or None
+INDEX_REDUCTION = os.getenv("INDEX_REDUCTION", "pca")
+INDEX_TYPE = os.getenv("INDEX_TYPE", "auto")
+INDEX_METRIC = os.getenv("INDEX_METRIC", "l2")
+INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", "1"))
+INDEX_SHARD_BY = os.getenv("INDEX_SHARD_BY", "path_hash")
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() == "true"
 
 app = Flask(__name__)
 CORS(app)
 
-retriever_instance = None
+retrievers = {}
+code_indexes = {}
 answer_generator_instance = None
+index_catalog = IndexCatalog(VECTOR_STORE_DIR)
 query_decomposer = QueryDecomposer()
+retrieval_planner = RetrievalPlanner()
 safety_checker = SafetyCheck()
-
-
-def _get_retriever():
-    global retriever_instance
-    if retriever_instance is None:
-        retriever_instance = Retriever(faiss_index_path=FAISS_INDEX_PATH)
-    return retriever_instance
+answer_cache = AnswerCache()
+# Cached answers are only reused under the same generator, prompt template and retrieval defaults
+ANSWER_FINGERPRINT = config_fingerprint(
+    {
+        "generator_model": GENERATOR_MODEL,
+        "hybrid_search": [HYBRID_SEARCH, HYBRID_CANDIDATES],
+        "rerank": [RERANK, RERANK_MODEL, RERANK_CANDIDATES],
+        "diversify": [MMR, MMR_LAMBDA, MMR_CANDIDATES, MMR_MAX_PER_FILE],
+        "expand_tokens": [EXPAND_TOKENS, EXPAND_MAX_RADIUS],
+    },
+    sources=[prompt_builder.__file__],
+)
+semantic_cache = SemanticAnswerCache()
+
+_retriever_lock = threading.Lock()
+_code_index_lock = threading.Lock()
+_warmup_done = threading.Event()
+_warmup_thread = None
+_warmup_lock = threading.Lock()
+_warmup_state = {"started_at": None, "finished_at": None, "error": None}
+
+
+def _resolve_index(repo=None):
+    try:
+        key = index_catalog.resolve(repo)
+    except UnknownRepoError:
+        if repo or not os.path.exists(FAISS_INDEX_PATH):
+            raise
+        return None, FAISS_INDEX_PATH
+    return key, index_catalog.index_path(key)
+
+
+def _get_retriever(repo=None):
+    key, index_path = _resolve_index(repo)
+    retriever = retrievers.get(key)
+    if retriever is None or retriever.faiss_index_path != index_path:
+        # Another process published a newer version: load it once, then swap the reference
+        with _retriever_lock:
+            retriever = retrievers.get(key)
+            if retriever is None or retriever.faiss_index_path != index_path:
+                retriever = Retriever(faiss_index_path=index_path)
+                retrievers[key] = retriever
+                answer_cache.invalidate(key, index_path)
+                semantic_cache.invalidate(key, index_path)
+    return key, retriever
+
+
+def _get_code_index(repo=None):
+    key, index_path = _resolve_index(repo)
+    entry = code_indexes.get(key)
+    if entry is None or entry[0] != index_path:
+        with _code_index_lock:
+            entry = code_indexes.get(key)
+            if entry is None or entry[0] != index_path:
+                if not CodeSearchIndex.exists(index_path):
+                    raise CodeIndexMissingError("Index has no code search data. Re-index the repo.")
+                entry = (index_path, CodeSearchIndex.load(index_path))
+                code_indexes[key] = entry
+    return key, entry[1]
+
+
+def _warm_up():
+    _warmup_state["started_at"] = time.time()
+    try:
+        if index_catalog.entries() or os.path.exists(FAISS_INDEX_PATH):
+            warm_up_embedder(_get_retriever()[1].model_name)
+        else:
+            warm_up_embedder()
+        if RERANK:
+            warm_up_reranker()
+    except Exception as exc:
+        _warmup_state["error"] = str(exc)
+    finally:
+        _warmup_state["finished_at"] = time.time()
+        _warmup_done.set()
+
+
+def start_warm_up():
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is not None or _warmup_done.is_set():
+            return
+        if not WARMUP_ON_START:
+            _warmup_done.set()
+            return
+        _warmup_thread = threading.Thread(target=_warm_up, name="repopilot-warmup", daemon=True)
+        _warmup_thread.start()
+
+
+def create_app():
+    # Entry point for servers (e.g. gunicorn "app:create_app()"); importing app.py alone loads nothing
+    start_warm_up()
+    return app
+
+
+def _flag(payload, name):
+    # JSON clients send true/false, form-style ones "true"/"false"; "false" must not read as truthy
+    value = payload.get(name)
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "1", "yes", "on"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("false", "0", "no", "off"):
+        return False
+    raise ValueError(f"{name} must be true or false")
+
+
+def _int_option(payload, name, minimum=0):
+    value = payload.get(name)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().isdigit() or int(value) < minimum:
+        raise ValueError(f"{name} must be an integer of at least {minimum}")
+    return int(value)
 
 
 def _get_answer_generator():
@@ -56,15 +191,40 @@ def _get_answer_generator():
 def index_repo():
     payload = request.get_json(silent=True) or {}
     repo_url = payload.get("repo_url")
+    ref = payload.get("ref")
+    model_name = payload.get("model") or MODEL_NAME
+    reduction = payload.get("reduction") or INDEX_REDUCTION
+    index_type = payload.get("index_type") or INDEX_TYPE
+    metric = payload.get("metric") or INDEX_METRIC
+    shard_by = payload.get("shard_by") or INDEX_SHARD_BY
+    try:
+        reduce_dim = _int_option(payload, "reduce_dim", minimum=1) or INDEX_REDUCE_DIM
+        num_shards = _int_option(payload, "num_shards", minimum=1) or INDEX_SHARDS
+        model_info = model_fingerprint(model_name)
+        for name, value, choices in (
+            ("reduction", reduction, REDUCTION_METHODS),
+            ("index_type", index_type, INDEX_TYPES),
+            ("metric", metric, METRICS),
+            ("shard_by", shard_by, SHARD_STRATEGIES),
+        ):
+            if value not in choices:
+                raise ValueError(f"Unknown {name}: {value}. Use one of: {', '.join(choices)}")
+        if num_shards > 1 and reduce_dim:
+            raise ValueError("Sharded indexes do not support reduce_dim")
+    except ValueError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 400
 
     try:
-        temp_folder_path = None
         files_count = None
 
         if repo_url:
-            result = load_github_repo(repo_url)
+            result = load_github_repo(repo_url, ref=ref)
             temp_folder_path = result["temp_path"]
             files_count = result["files_count"]
+            key = repo_key(result["owner"], result["repo"], result["ref"])
+        else:
+            temp_folder_path = latest_repo_temp_dir()
+            key = repo_key("local", os.path.basename(temp_folder_path), "local")
 
         chunks = chunk_repo(temp_folder_path)
         if not chunks:
@@ -73,19 +233,59 @@ def index_repo():
                 "message": "No chunks created. Check if files match allowed extensions."
             }), 400
 
-        embedded_chunks = create_embeddings(chunks)
-        faiss_index = FaissIndex(index_path=FAISS_INDEX_PATH)
+        embedded_chunks = create_embeddings(chunks, model_name=model_name)
+        version, index_path = index_catalog.new_version(key)
+        index_options = {
+            "index_path": index_path,
+            "model_info": model_info,
+            "reduce_dim": reduce_dim,
+            "reduction": reduction,
+            "index_type": index_type,
+            "build_params": payload.get("build_params"),
+            "metric": metric,
+        }
+        if num_shards > 1:
+            faiss_index = ShardedFaissIndex(
+                num_shards=num_shards,
+                shard_by=shard_by,
+                **index_options,
+            )
+        else:
+            faiss_index = FaissIndex(**index_options)
+        faiss_index.profile = build_repo_profile(chunks)
+        faiss_index.calibration_vectors = embed_texts(
+            calibration_questions(chunks), show_progress_bar=False, model_name=model_name
+        )
         faiss_index.add(embedded_chunks)
         faiss_index.save()
+        code_index = CodeSearchIndex.build(index_path, temp_folder_path, {chunk["file"] for chunk in chunks})
+        index_catalog.publish(key, version)
 
-        global retriever_instance
-        retriever_instance = Retriever(faiss_index_path=FAISS_INDEX_PATH)
+        index_catalog.register(key, {
+            "version": version,
+            "repo_url": repo_url,
+            "files_count": files_count,
+            "chunks_count": len(chunks),
+            "embedding_model": model_name,
+            "index_type": faiss_index.index_type,
+            "metric": faiss_index.metric,
+            "num_shards": num_shards,
+        })
+        # In-flight requests keep the retriever they already hold; new ones see this one
+        retrievers[key] = Retriever(faiss_index=faiss_index, model_name=model_name)
+        code_indexes[key] = (index_path, code_index)
+        answer_cache.invalidate(key, index_path)
+        semantic_cache.invalidate(key, index_path)
 
         return jsonify({
             "success": True,
             "message": "Indexing complete",
+            "repo": key,
+            "version": version,
             "files_count": files_count,
             "chunks_count": len(chunks),
+            "embedding_model": model_name,
+            "index_type": faiss_index.index_type,
             "index_path": faiss_index.index_path
         })
     except Exception as exc:
@@ -95,50 +295,201 @@ def index_repo():
 @app.route("/ask", methods=["POST"])
 def ask_question():
     payload = request.get_json(silent=True) or {}
-    question = payload.get("question", "").strip()
+    question = payload.get("question", "")
+    if not isinstance(question, str):
+        return jsonify({"success": False, "message": "question must be a string"}), 400
+    question, filters = parse_filter_query(question.strip())
 
     if not question:
         return jsonify({"success": False, "message": "question is required"}), 400
 
     try:
-        retriever = _get_retriever()
-        chunks = retriever.retrieve(question, top_k=int(payload.get("top_k", 5)))
+        filters = merge_filters(filters, payload.get("filters"))
+        normalized_filters = normalize_filters(filters)
+    except ValueError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 400
+
+    try:
+        top_k = _int_option(payload, "top_k", minimum=1)
+        retrieval_options = {option: _int_option(payload, option) for option in ("nprobe", "ef_search", "expand_tokens")}
+        retrieval_options.update({option: _flag(payload, option) for option in ("hybrid", "rerank", "diversify")})
+        no_cache = _flag(payload, "no_cache") or False
+    except ValueError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 400
+
+    try:
+        repo, retriever = _get_retriever(payload.get("repo"))
+        cache_key = None
+        if ANSWER_CACHE and not no_cache:
+            cache_key = answer_key(
+                repo, retriever.faiss_index_path, question, top_k, normalized_filters, retrieval_options,
+                fingerprint=ANSWER_FINGERPRINT,
+            )
+            cached = answer_cache.get(cache_key)
+            if cached is not None:
+                return jsonify({**cached, "cached": True}), 200
 
         question_type = query_decomposer.decompose(question)
-        safety_result = safety_checker.check(question_type, chunks)
+        plan = retrieval_planner.plan(question_type, top_k=top_k, filters=filters)
+        chunks = retrieval_planner.execute(retriever, question, plan, **retrieval_options)
+
+        safety_result = safety_checker.check(question_type, chunks, score_stats=retriever.score_stats)
 
         if not safety_result.get("allowed"):
-            return jsonify({
+            body = {
                 "success": False,
                 "message": safety_result.get("reason", "Unsafe to answer"),
                 "question_type": question_type,
+                "retrieval_plan": plan,
                 "safety": safety_result,
-            }), 200
+            }
+            if cache_key:
+                answer_cache.put(cache_key, body, repo=repo, index_version=retriever.faiss_index_path)
+            return jsonify(body), 200
+
+        semantic_key = None
+        query_vector = retriever.cached_query_vector(question) if cache_key and SEMANTIC_CACHE else None
+        if query_vector is not None:
+            # Reuse the embedding retrieval already computed; symbol-only lookups have none and skip this
+            semantic_key = chunk_set_key(question_type.get("intent"), chunks)
+            similar = semantic_cache.get(repo, retriever.faiss_index_path, query_vector, semantic_key)
+            if similar is not None:
+                body = {**similar["body"], "question_type": question_type, "retrieval_plan": plan, "filters": filters}
+                answer_cache.put(cache_key, body, repo=repo, index_version=retriever.faiss_index_path)
+                return jsonify({
+                    **body,
+                    "cached": "semantic",
+                    "matched_question": similar["question"],
+                    "similarity": similar["similarity"],
+                })
 
         overview_signals = None
         if question_type.get("intent") == "overview":
-            overview_signals = extract_overview_signals(chunks)
+            # Indexes built before profiles existed fall back to the retrieved sample
+            overview_signals = retriever.profile or extract_overview_signals(chunks)
         prompt = build_prompt(question, chunks, question_meta=question_type, overview_signals=overview_signals)
         generator = _get_answer_generator()
         answer = generator.generate(prompt)
 
-        return jsonify({
+        body = {
             "success": True,
+            "repo": repo,
             "answer": answer,
             "question_type": question_type,
+            "retrieval_plan": plan,
             "safety": safety_result,
             "chunks_used": len(chunks),
-        })
+            "filters": filters,
+        }
+        if cache_key:
+            answer_cache.put(cache_key, body, repo=repo, index_version=retriever.faiss_index_path)
+        if semantic_key:
+            semantic_cache.put(repo, retriever.faiss_index_path, query_vector, semantic_key, question, body)
+        return jsonify(body)
+    except UnknownRepoError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 404
     except Exception as exc:
         return jsonify({"success": False, "message": str(exc)}), 500
 
 
+@app.route("/repos", methods=["GET"])
+def list_repos():
+    return jsonify({"repos": index_catalog.entries()})
+
+
+@app.route("/overview", methods=["GET"])
+def repo_overview():
+    try:
+        repo, retriever = _get_retriever(request.args.get("repo"))
+    except UnknownRepoError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 404
+
+    if retriever.profile is None:
+        return jsonify({"success": False, "repo": repo, "message": "Index has no overview profile. Re-index the repo."}), 404
+    return jsonify({"success": True, "repo": repo, "profile": retriever.profile})
+
+
+@app.route("/symbols", methods=["GET"])
+def find_symbols():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"success": False, "message": "q is required"}), 400
+
+    try:
+        repo, retriever = _get_retriever(request.args.get("repo"))
+        symbols = retriever.faiss.find_symbols(
+            query,
+            mode=request.args.get("mode", "prefix"),
+            limit=int(request.args.get("limit", 20)),
+        )
+        return jsonify({"success": True, "repo": repo, "symbols": symbols})
+    except UnknownRepoError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 404
+    except ValueError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 400
+
+
+@app.route("/search", methods=["GET"])
+def search_code():
+    query = request.args.get("q", "")
+    if not query:
+        return jsonify({"success": False, "message": "q is required"}), 400
+
+    try:
+        limit = min(_int_option(request.args, "limit", minimum=1) or CODE_SEARCH_MAX_RESULTS, CODE_SEARCH_MAX_RESULTS)
+        regex = _flag(request.args, "regex") or False
+        case_sensitive = _flag(request.args, "case_sensitive") or False
+    except ValueError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 400
+
+    try:
+        repo, code_index = _get_code_index(request.args.get("repo"))
+        result = code_index.search(
+            query,
+            regex=regex,
+            case_sensitive=case_sensitive,
+            path=request.args.get("path"),
+            max_results=limit,
+        )
+        return jsonify({"success": True, "repo": repo, **result})
+    except (UnknownRepoError, CodeIndexMissingError) as exc:
+        return jsonify({"success": False, "message": str(exc)}), 404
+    except ValueError as exc:
+        return jsonify({"success": False, "message": str(exc)}), 400
+
+
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({"status": "ok"})
 
 
+@app.route("/ready", methods=["GET"])
+def ready():
+    if _warmup_thread is None and not _warmup_done.is_set():
+        return jsonify({"ready": True, "status": "ready", "warning": "Warm-up was not started, components will load on first use"})
+    if not _warmup_done.is_set():
+        return jsonify({"ready": False, "status": "warming_up"}), 503
+
+    body = {"ready": True, "status": "ready"}
+    if _warmup_state["started_at"] is not None:
+        body["warmup_seconds"] = round(_warmup_state["finished_at"] - _warmup_state["started_at"], 3)
+    if _warmup_state["error"]:
+        body["warning"] = f"Warm-up failed, components will load on first use: {_warmup_state['error']}"
+    return jsonify(body)
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "query_cache": query_cache_stats(),
+        "query_batcher": query_batcher_stats(),
+        "reranker": reranker_stats(),
+        "answer_cache": answer_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+    })
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=API_PORT, debug=DEBUG_MODE)
+    create_app().run(host="0.0.0.0", port=API_PORT, debug=DEBUG_MODE)
 
     
\ No newline at end of file
@@ -164,11 +164,14 @@ def _extract_brace_functions(lines):
     return functions
 
 
+def latest_repo_temp_dir():
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return _latest_repo_temp_dir(os.path.join(backend_dir, "data", "repo_temp"))
+
+
 def chunk_repo(temp_folder_path=None):
     if not temp_folder_path:
-        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        base_dir = os.path.join(backend_dir, "data", "repo_temp")
-        temp_folder_path = _latest_repo_temp_dir(base_dir)
+        temp_folder_path = latest_repo_temp_dir()
 
     all_chunks = []
 
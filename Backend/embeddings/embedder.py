@@ -3,33 +3,51 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sentence_transformers import SentenceTransformer
-
-MODEL_NAME = "all-MiniLM-L6-v2"
-_model = None
+try:
+    from .model_registry import DEFAULT_MODEL_NAME, get_model_spec
+except ImportError:
+    from model_registry import DEFAULT_MODEL_NAME, get_model_spec
+
+MODEL_NAME = DEFAULT_MODEL_NAME
+_models = {}
+
+
+def _get_model(model_name=None):
+    model_name = model_name or MODEL_NAME
+    model = _models.get(model_name)
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+
+        spec = get_model_spec(model_name)
+        print(f"Loading embedding model: {model_name}...")
+        model = SentenceTransformer(model_name)
+        model.max_seq_length = spec["max_seq_length"]
+        _models[model_name] = model
+        print("Model loaded successfully.")
+    return model
 
 
-def _get_model():
-    global _model
-    if _model is None:
-        print(f"Loading embedding model: {MODEL_NAME}...")
-        _model = SentenceTransformer(MODEL_NAME)
-        print("Model loaded successfully.")
-    return _model
+def warm_up(model_name=None):
+    _get_model(model_name)
 
 
-def embed_texts(texts):
-    model = _get_model()
-    vectors = model.encode(texts, show_progress_bar=True)
+def embed_texts(texts, show_progress_bar=True, model_name=None):
+    model_name = model_name or MODEL_NAME
+    model = _get_model(model_name)
+    vectors = model.encode(
+        texts,
+        show_progress_bar=show_progress_bar,
+        normalize_embeddings=get_model_spec(model_name)["normalize"],
+    )
     return vectors.tolist()
 
 
-def create_embeddings(chunks):
+def create_embeddings(chunks, model_name=None):
     if not chunks:
         return []
 
     texts = [chunk["text"] for chunk in chunks]
-    vectors = embed_texts(texts)
+    vectors = embed_texts(texts, model_name=model_name)
 
     embedded_chunks = []
     for i, chunk in enumerate(chunks):
@@ -59,6 +77,7 @@ if __name__ == "__main__":
         nargs="?",
         help="Path to temp folder (defaults to latest repopilot_* in Backend/data/repo_temp)",
     )
+    parser.add_argument("--model", default=MODEL_NAME, help=f"Embedding model name (default: {MODEL_NAME})")
     args = parser.parse_args()
 
     print("Step 1: Loading chunks...")
@@ -66,7 +85,7 @@ if __name__ == "__main__":
     print(f"Loaded {len(chunks)} chunks\n")
 
     print("Step 2: Generating embeddings...")
-    embedded_chunks = create_embeddings(chunks)
+    embedded_chunks = create_embeddings(chunks, model_name=args.model)
     print(f"Generated embeddings for {len(embedded_chunks)} chunks\n")
 
     print("Sample output:")
@@ -0,0 +1,85 @@
+import os
+
+MODEL_REGISTRY = {
+    "paraphrase-MiniLM-L3-v2": {
+        "dimension": 384,
+        "max_seq_length": 128,
+        "normalize": True,
+        "description": "Smallest and fastest encoder, lower retrieval quality",
+    },
+    "all-MiniLM-L6-v2": {
+        "dimension": 384,
+        "max_seq_length": 256,
+        "normalize": True,
+        "description": "Default encoder, good balance of speed and quality",
+    },
+    "all-MiniLM-L12-v2": {
+        "dimension": 384,
+        "max_seq_length": 256,
+        "normalize": True,
+        "description": "Deeper MiniLM, slower than L6 with slightly better quality",
+    },
+    "BAAI/bge-small-en-v1.5": {
+        "dimension": 384,
+        "max_seq_length": 512,
+        "normalize": True,
+        "description": "Small BGE encoder with a longer context window",
+    },
+    "all-mpnet-base-v2": {
+        "dimension": 768,
+        "max_seq_length": 384,
+        "normalize": True,
+        "description": "Larger encoder, best quality, roughly 5x slower than MiniLM-L6",
+    },
+    "BAAI/bge-base-en-v1.5": {
+        "dimension": 768,
+        "max_seq_length": 512,
+        "normalize": True,
+        "description": "Base BGE encoder with a longer context window",
+    },
+}
+
+DEFAULT_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+
+def get_model_spec(model_name=None):
+    model_name = model_name or DEFAULT_MODEL_NAME
+    spec = MODEL_REGISTRY.get(model_name)
+    if spec is None:
+        raise ValueError(
+            f"Unknown embedding model: {model_name}. "
+            f"Available models: {', '.join(sorted(MODEL_REGISTRY))}"
+        )
+    return spec
+
+
+def model_fingerprint(model_name=None):
+    model_name = model_name or DEFAULT_MODEL_NAME
+    spec = get_model_spec(model_name)
+    return {
+        "name": model_name,
+        "dimension": spec["dimension"],
+        "max_seq_length": spec["max_seq_length"],
+        "normalize": spec["normalize"],
+    }
+
+
+def check_fingerprint(fingerprint, model_name=None):
+    if model_name and fingerprint["name"] != model_name:
+        raise ValueError(
+            f"Index was built with embedding model '{fingerprint['name']}', "
+            f"but '{model_name}' was requested"
+        )
+
+    expected = model_fingerprint(fingerprint["name"])
+    if expected != fingerprint:
+        raise ValueError(
+            f"Index fingerprint {fingerprint} does not match the registry entry {expected}. "
+            "Re-index the repository with the current model settings."
+        )
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps({"default": DEFAULT_MODEL_NAME, "models": MODEL_REGISTRY}, indent=2))
@@ -0,0 +1,113 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    from .embedder import MODEL_NAME, embed_texts
+except ImportError:
+    from embedder import MODEL_NAME, embed_texts
+
+QUERY_BATCHING = os.getenv("QUERY_BATCHING", "true").lower() == "true"
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+
+
+class QueryBatcher:
+    def __init__(self, encode_fn, max_batch_size=QUERY_BATCH_MAX_SIZE, max_wait_ms=QUERY_BATCH_MAX_WAIT_MS):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.queries = 0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def embed(self, text, timeout=None):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((text, future))
+        return future.result(timeout)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            unique_texts = list(dict.fromkeys(text for text, _ in batch))
+
+            try:
+                vectors = self.encode_fn(unique_texts)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            by_text = dict(zip(unique_texts, vectors))
+            for text, future in batch:
+                future.set_result(by_text[text])
+
+            self.batches += 1
+            self.queries += len(batch)
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_query_batcher(model_name=None):
+    model_name = model_name or MODEL_NAME
+    batcher = _batchers.get(model_name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(model_name)
+            if batcher is None:
+                batcher = QueryBatcher(
+                    lambda texts: embed_texts(texts, show_progress_bar=False, model_name=model_name)
+                )
+                _batchers[model_name] = batcher
+    return batcher
+
+
+def embed_query(text, model_name=None):
+    if not QUERY_BATCHING:
+        return embed_texts([text], show_progress_bar=False, model_name=model_name)[0]
+    return get_query_batcher(model_name).embed(text)
+
+
+def query_batcher_stats():
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
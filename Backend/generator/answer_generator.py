@@ -1,21 +1,17 @@
 import os
 import sys
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    print("ERROR: google-generativeai not installed. Run: pip install google-generativeai")
-    sys.exit(1)
-
 try:
     from dotenv import load_dotenv
 except ImportError:
     def load_dotenv(dotenv_path=None):
         pass
 
+GENERATOR_MODEL = os.getenv("GENERATOR_MODEL", "gemini-2.5-flash")
+
 
 class AnswerGenerator:
-    def __init__(self, model_name="gemini-2.5-flash"):
+    def __init__(self, model_name=GENERATOR_MODEL):
         backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         env_file = os.path.join(backend_dir, ".env")
         if os.path.exists(env_file):
@@ -28,6 +24,11 @@ class AnswerGenerator:
                 "Please add it to Backend/.env file or set as environment variable."
             )
         
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            raise RuntimeError("google-generativeai not installed. Run: pip install google-generativeai")
+
         try:
             genai.configure(api_key=api_key)
             self.model = genai.GenerativeModel(model_name)
@@ -51,7 +52,7 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description="Generate answer using Gemini API.")
     parser.add_argument("prompt", help="The prompt to send to Gemini")
-    parser.add_argument("--model", default="gemini-2.5-flash", help="Gemini model name")
+    parser.add_argument("--model", default=GENERATOR_MODEL, help="Gemini model name")
     
     args = parser.parse_args()
     
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    from .query_cache import LRUCache, normalize_question
+except ImportError:
+    from query_cache import LRUCache, normalize_question
+
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "0")) or None
+# Disk entries outlive the process, so they expire even when the memory tier does not
+ANSWER_CACHE_DISK_TTL = float(os.getenv("ANSWER_CACHE_DISK_TTL", str(7 * 24 * 3600))) or None
+# Empty disables the on-disk tier; otherwise answers survive restarts and are shared across workers
+ANSWER_CACHE_DIR = os.getenv("ANSWER_CACHE_DIR", "")
+ANSWER_CACHE_FILE = "answers.sqlite"
+
+
+def config_fingerprint(settings, sources=()):
+    # Everything besides the index that shapes an answer: generator model, retrieval defaults and
+    # the prompt template files, hashed by content so editing a template retires old answers
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    for source in sources:
+        with open(source, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def answer_key(repo, index_version, question, top_k=None, filters=None, options=None, fingerprint=None):
+    # index_version is whatever identifies the published index (its path under the version dir),
+    # so publishing a new version makes every older entry unreachable
+    return json.dumps(
+        [repo, index_version, normalize_question(question), top_k, filters or {}, options or {}, fingerprint],
+        sort_keys=True,
+        default=list,
+    )
+
+
+class AnswerCache:
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL, cache_dir=ANSWER_CACHE_DIR,
+                 disk_ttl_seconds=ANSWER_CACHE_DISK_TTL):
+        self.memory = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self.path = os.path.join(cache_dir, ANSWER_CACHE_FILE) if cache_dir else None
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.path:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, repo TEXT, index_version TEXT, body TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_repo ON answers (repo)")
+            if disk_ttl_seconds:
+                self._conn.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - disk_ttl_seconds,))
+            self._conn.commit()
+
+    @staticmethod
+    def _digest(key):
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        body = self.memory.get(key)
+        if body is not None or self._conn is None:
+            return body
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created_at FROM answers WHERE key = ?", (self._digest(key),)
+            ).fetchone()
+            if row is None or (self.disk_ttl_seconds and time.time() - row[1] > self.disk_ttl_seconds):
+                self.disk_misses += 1
+                return None
+            self.disk_hits += 1
+
+        body = json.loads(row[0])
+        self.memory.put(key, body)
+        return body
+
+    def put(self, key, body, repo=None, index_version=None):
+        self.memory.put(key, body)
+        if self._conn is None:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, repo, index_version, body, created_at) VALUES (?, ?, ?, ?, ?)",
+                (self._digest(key), repo, index_version, json.dumps(body), time.time()),
+            )
+            self._conn.commit()
+
+    def invalidate(self, repo, index_version=None):
+        # Old entries can no longer be hit once the version changes; this just frees the space
+        self.invalidations += 1
+        def stale(key):
+            key_repo, key_version = json.loads(key)[:2]
+            return key_repo == repo and key_version != index_version
+
+        self.memory.discard_where(stale)
+        if self._conn is None:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM answers WHERE repo IS ? AND index_version IS NOT ?", (repo, index_version)
+            )
+            self._conn.commit()
+
+    def stats(self):
+        memory = self.memory.stats()
+        hits = memory["hits"] + self.disk_hits
+        lookups = memory["hits"] + memory["misses"]
+        return {
+            "memory": memory,
+            "disk": {
+                "enabled": self._conn is not None,
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+            },
+            "invalidations": self.invalidations,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
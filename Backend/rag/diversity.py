@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+
+MMR = os.getenv("MMR", "true").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+MMR_CANDIDATES = int(os.getenv("MMR_CANDIDATES", "20"))
+MMR_MAX_PER_FILE = int(os.getenv("MMR_MAX_PER_FILE", "2")) or None
+
+
+def _unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mmr_select(
+    query_vector,
+    candidate_vectors,
+    top_k,
+    lambda_=MMR_LAMBDA,
+    relevance=None,
+    files=None,
+    max_per_file=MMR_MAX_PER_FILE,
+):
+    candidates = _unit_rows(candidate_vectors)
+    if relevance is None:
+        relevance = candidates @ _unit_rows(query_vector).reshape(-1)
+    relevance = np.asarray(relevance, dtype="float32")
+    similarity = candidates @ candidates.T
+
+    selected = []
+    chosen = np.zeros(len(candidates), dtype=bool)
+    available = np.ones(len(candidates), dtype=bool)
+    redundancy = np.zeros(len(candidates), dtype="float32")
+    files = np.asarray(files) if files is not None and max_per_file else None
+    per_file = {}
+
+    while len(selected) < top_k and not chosen.all():
+        if not available.any():
+            # Every file left is at its cap; fill the remaining slots in MMR order rather than return fewer
+            files = None
+            available = ~chosen
+
+        # Redundancy is the closest similarity to anything already selected
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[~available] = -np.inf
+
+        best = int(np.argmax(scores))
+        selected.append(best)
+        chosen[best] = True
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+
+        if files is not None:
+            per_file[files[best]] = per_file.get(files[best], 0) + 1
+            if per_file[files[best]] >= max_per_file:
+                available &= files != files[best]
+
+    return selected
@@ -0,0 +1,101 @@
+import os
+
+EXPAND_TOKENS = int(os.getenv("EXPAND_TOKENS", "0"))
+EXPAND_MAX_RADIUS = int(os.getenv("EXPAND_MAX_RADIUS", "2"))
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def _numbered_lines(chunk):
+    return enumerate(chunk["text"].split("\n"), start=chunk["start_line"])
+
+
+def _has_lines(chunk):
+    return chunk.get("start_line") is not None and chunk.get("end_line") is not None
+
+
+def _new_text(chunk, parts):
+    # The part of chunk's text whose lines are not already in parts
+    if not _has_lines(chunk) or not all(_has_lines(part) for part in parts):
+        return chunk["text"]
+    covered = [(part["start_line"], part["end_line"]) for part in parts]
+    return "\n".join(
+        line for number, line in _numbered_lines(chunk)
+        if not any(start <= number <= end for start, end in covered)
+    )
+
+
+def _merge(hit, parts):
+    parts = sorted(parts, key=lambda chunk: chunk["chunk_id"])
+    texts = [chunk["text"] for chunk in parts]
+    if all(_has_lines(chunk) for chunk in parts):
+        # A nested function overlaps the function around it: emit every source line once, in file order
+        seen = set()
+        texts = []
+        for chunk in sorted(parts, key=lambda chunk: (chunk["start_line"], -chunk["end_line"])):
+            kept = [line for number, line in _numbered_lines(chunk) if number not in seen]
+            seen.update(number for number, _ in _numbered_lines(chunk))
+            if kept:
+                texts.append("\n".join(kept))
+
+    lines = [chunk[field] for chunk in parts for field in ("start_line", "end_line") if chunk.get(field) is not None]
+    merged = dict(hit)
+    merged["text"] = "\n".join(texts)
+    if lines:
+        merged["start_line"] = min(lines)
+        merged["end_line"] = max(lines)
+    merged["expanded_chunk_ids"] = [chunk["chunk_id"] for chunk in parts]
+    return merged
+
+
+def expand_chunks(faiss_index, chunks, token_budget, max_radius=EXPAND_MAX_RADIUS):
+    if token_budget <= 0 or not chunks:
+        return chunks
+
+    taken = {(chunk["file"], chunk["chunk_id"]) for chunk in chunks}
+    parts = [[chunk] for chunk in chunks]
+    remaining = token_budget
+
+    # Enclosing spans first: a hit inside a nested function becomes the whole function
+    for i, chunk in enumerate(chunks):
+        span = faiss_index.enclosing_chunk(chunk["file"], chunk["chunk_id"], chunk.get("start_line"), chunk.get("end_line"))
+        if span is None or (span["file"], span["chunk_id"]) in taken:
+            continue
+        cost = estimate_tokens(span["text"]) - estimate_tokens(chunk["text"])
+        if cost <= remaining:
+            remaining -= cost
+            taken.add((span["file"], span["chunk_id"]))
+            parts[i] = [span]
+
+    # Then grow each hit outwards one chunk at a time, best-ranked hits first,
+    # so the budget is shared instead of spent on the first hit alone
+    neighbors = [
+        {n["chunk_id"]: n for n in faiss_index.neighbor_chunks(chunk["file"], chunk["chunk_id"], max_radius)}
+        if parts[i][0] is chunk else {}
+        for i, chunk in enumerate(chunks)
+    ]
+    for radius in range(1, max_radius + 1):
+        for i, chunk in enumerate(chunks):
+            if parts[i][0] is not chunk:
+                continue
+            for offset in (radius, -radius):
+                neighbor = neighbors[i].get(chunk["chunk_id"] + offset)
+                if neighbor is None or (chunk["file"], neighbor["chunk_id"]) in taken:
+                    continue
+                # Only extend contiguously: the chunk in between must already be merged
+                inner = chunk["chunk_id"] + offset - (1 if offset > 0 else -1)
+                if inner != chunk["chunk_id"] and inner not in {part["chunk_id"] for part in parts[i]}:
+                    continue
+                # Lines already merged (a nested function inside the hit) cost nothing
+                new_text = _new_text(neighbor, parts[i])
+                cost = estimate_tokens(new_text) if new_text else 0
+                if cost > remaining:
+                    continue
+                remaining -= cost
+                taken.add((chunk["file"], neighbor["chunk_id"]))
+                parts[i].append(neighbor)
+
+    return [chunk if group == [chunk] else _merge(chunk, group) for chunk, group in zip(chunks, parts)]
@@ -19,6 +19,21 @@ Content:
 """
     else:
         context = "[No relevant code found in the repository]"
+
+    profile = ""
+    if overview_signals:
+        profile = "\nRepository Profile:\n"
+        for key, label in (
+            ("languages", "Languages"),
+            ("frameworks", "Frameworks"),
+            ("entry_points", "Entry points"),
+            ("top_level_dirs", "Top-level directories"),
+            ("keywords", "Frequent keywords"),
+        ):
+            if overview_signals.get(key):
+                profile += f"- {label}: {', '.join(overview_signals[key])}\n"
+        if overview_signals.get("file_count"):
+            profile += f"- Size: {overview_signals['file_count']} files, {overview_signals.get('chunk_count', 'N/A')} chunks\n"
     
     prompt = f"""You are a senior software engineer assistant.
 
@@ -34,7 +49,7 @@ User Question:
 
 Code Context:
 {context}
-
+{profile}
 Rules:
 - Reference specific file names in your answer
 - Quote code when relevant
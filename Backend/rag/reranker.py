@@ -0,0 +1,139 @@
+import hashlib
+import os
+import threading
+import time
+
+try:
+    from .query_cache import LRUCache, normalize_question
+except ImportError:
+    from query_cache import LRUCache, normalize_question
+
+RERANK = os.getenv("RERANK", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "4096"))
+RERANK_MAX_CHARS = 2000
+
+
+class Reranker:
+    def __init__(self, model_name=RERANK_MODEL, batch_size=RERANK_BATCH_SIZE, cache_size=RERANK_CACHE_SIZE):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = LRUCache(max_size=cache_size)
+        self.reranked = 0
+        self.fallbacks = 0
+        self.cold_fallbacks = 0
+        self._model = None
+        self._loading = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    print(f"Loading reranking model: {self.model_name}...")
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                    print("Model loaded successfully.")
+        return self._model
+
+    def _load_in_background(self):
+        with self._lock:
+            if self._model is not None or self._loading is not None:
+                return
+            self._loading = threading.Thread(target=self._background_load, name="reranker-load", daemon=True)
+            self._loading.start()
+
+    def _background_load(self):
+        try:
+            self._get_model()
+        except Exception as exc:
+            print(f"Reranking model failed to load, will retry on a later request: {exc}")
+        finally:
+            self._loading = None
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def _pair_key(self, question, chunk):
+        digest = hashlib.blake2b(chunk.get("text", "").encode("utf-8"), digest_size=16).digest()
+        return (normalize_question(question), digest)
+
+    def score(self, question, chunks, deadline=None):
+        scores = [self.cache.get(self._pair_key(question, chunk)) for chunk in chunks]
+        missing = [i for i, score in enumerate(scores) if score is None]
+
+        for start in range(0, len(missing), self.batch_size):
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            batch = missing[start:start + self.batch_size]
+            pairs = [(question, chunks[i].get("text", "")[:RERANK_MAX_CHARS]) for i in batch]
+            for i, score in zip(batch, self._get_model().predict(pairs, batch_size=self.batch_size).tolist()):
+                scores[i] = score
+                self.cache.put(self._pair_key(question, chunks[i]), score)
+
+        return scores
+
+    def rerank(self, question, chunks, top_k, deadline=None):
+        if not chunks:
+            return chunks
+
+        if not self.ready:
+            # Loading the cross-encoder takes seconds; never spend a request's budget on it.
+            # Requests keep retrieval order until the background load finishes.
+            self._load_in_background()
+            self.cold_fallbacks += 1
+            return chunks[:top_k]
+
+        scores = self.score(question, chunks, deadline=deadline)
+        if any(score is None for score in scores):
+            # Out of time: keep retrieval order rather than mixing scored and unscored
+            # candidates. Finished pairs stay cached for the next request.
+            self.fallbacks += 1
+            return chunks[:top_k]
+
+        self.reranked += 1
+        ranked = sorted(zip(scores, range(len(chunks))), key=lambda item: -item[0])
+        return [dict(chunks[i], rerank_score=score) for score, i in ranked[:top_k]]
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "loaded": self.ready,
+            "reranked": self.reranked,
+            "fallbacks": self.fallbacks,
+            "cold_fallbacks": self.cold_fallbacks,
+            "pair_cache": self.cache.stats(),
+        }
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
+
+
+def warm_up():
+    get_reranker()._get_model()
+
+
+def rerank_deadline(budget_ms=None):
+    return time.perf_counter() + (RERANK_BUDGET_MS if budget_ms is None else budget_ms) / 1000.0
+
+
+def reranker_stats():
+    return _reranker.stats() if _reranker is not None else None
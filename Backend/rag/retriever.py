@@ -2,58 +2,265 @@ import os
 import re
 import sys
 
+import numpy as np
+
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embeddings"))
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vector_db"))
 
-from embedder import embed_texts
-from faiss_index import FaissIndex
+from embedder import MODEL_NAME, embed_texts
+from query_batcher import embed_query
+from model_registry import check_fingerprint
+from faiss_index import chunk_uid
+from sharded_index import load_index
+from query_cache import LRUCache, normalize_question
+from reranker import RERANK, RERANK_CANDIDATES, get_reranker, rerank_deadline
+from diversity import MMR, MMR_CANDIDATES, MMR_MAX_PER_FILE, mmr_select
+from expansion import EXPAND_TOKENS, expand_chunks
+
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "0")) or None
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = 60
+
+_query_vector_cache = LRUCache(max_size=QUERY_CACHE_SIZE, ttl_seconds=QUERY_CACHE_TTL)
 
 
 class Retriever:
-    def __init__(self, faiss_index_path=None, vector_dim=None):
-        if faiss_index_path is None:
-            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            faiss_index_path = os.path.join(backend_dir, "data", "vector_store", "index.faiss")
-        
-        self.faiss_index_path = faiss_index_path
-        self.vector_dim = vector_dim
-        
-        if not os.path.exists(faiss_index_path):
-            raise FileNotFoundError(f"FAISS index not found at: {faiss_index_path}")
-        
-        self.faiss = FaissIndex(
-            vector_dim=vector_dim,
-            index_path=faiss_index_path
-        )
-        self.faiss.load()
-        
+    def __init__(self, faiss_index_path=None, vector_dim=None, model_name=None, faiss_index=None):
+        if faiss_index is not None:
+            # Hot swap after a publish: reuse the index that was just built in memory
+            self.faiss = faiss_index
+            self.faiss_index_path = faiss_index.index_path
+            self.vector_dim = vector_dim
+        else:
+            if faiss_index_path is None:
+                backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                faiss_index_path = os.path.join(backend_dir, "data", "vector_store", "index.faiss")
+
+            self.faiss_index_path = faiss_index_path
+            self.vector_dim = vector_dim
+
+            if not os.path.exists(faiss_index_path + ".meta"):
+                raise FileNotFoundError(f"FAISS index not found at: {faiss_index_path}")
+
+            self.faiss = load_index(faiss_index_path)
+
         if self.vector_dim is None:
             self.vector_dim = self.faiss.vector_dim
 
-    def retrieve(self, question, top_k=5, intent=None):
-        if not question or not isinstance(question, str):
-            raise ValueError("question must be a non-empty string")
+        if self.faiss.model_info:
+            check_fingerprint(self.faiss.model_info, model_name)
+            self.model_name = self.faiss.model_info["name"]
+        else:
+            self.model_name = model_name or MODEL_NAME
+
+    @property
+    def score_stats(self):
+        return self.faiss.score_stats
+
+    @property
+    def profile(self):
+        return self.faiss.profile
+
+    def retrieve(
+        self,
+        question,
+        top_k=5,
+        intent=None,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        hybrid=None,
+        rerank=None,
+        diversify=None,
+        max_per_file=None,
+        expand_tokens=None,
+    ):
+        return self.retrieve_batch(
+            [question],
+            top_k=top_k,
+            intent=intent,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            filters=filters,
+            hybrid=hybrid,
+            rerank=rerank,
+            diversify=diversify,
+            max_per_file=max_per_file,
+            expand_tokens=expand_tokens,
+        )[0]
+
+    def retrieve_batch(
+        self,
+        questions,
+        top_k=5,
+        intent=None,
+        nprobe=None,
+        ef_search=None,
+        filters=None,
+        hybrid=None,
+        rerank=None,
+        diversify=None,
+        max_per_file=None,
+        expand_tokens=None,
+    ):
+        if not questions:
+            raise ValueError("questions must be a non-empty list")
+
+        for question in questions:
+            if not question or not isinstance(question, str):
+                raise ValueError("question must be a non-empty string")
         
         if top_k < 1:
             raise ValueError("top_k must be at least 1")
         
-        if self.faiss.index.ntotal == 0:
+        if self.faiss.ntotal == 0:
             raise ValueError("FAISS index is empty")
         
-        query_vector = embed_texts([question])[0]
+        resolved = {}
+        if intent == "location":
+            # "Where is X" naming a known symbol is answered from the symbol table,
+            # without embedding the question or touching FAISS
+            for i, question in enumerate(questions):
+                definitions = self.faiss.symbol_search(question, top_k=top_k, filters=filters)
+                if definitions:
+                    resolved[i] = definitions
+
+        remaining = [question for i, question in enumerate(questions) if i not in resolved]
+        searched = iter(self._search(remaining, top_k, intent, nprobe, ef_search, filters, hybrid, rerank, diversify, max_per_file) if remaining else [])
+        batch_results = [resolved[i] if i in resolved else next(searched) for i in range(len(questions))]
+
+        expand_tokens = EXPAND_TOKENS if expand_tokens is None else expand_tokens
+        if expand_tokens > 0:
+            batch_results = [expand_chunks(self.faiss, results, expand_tokens) for results in batch_results]
+        return batch_results
+
+    def _search(self, questions, top_k, intent, nprobe, ef_search, filters, hybrid, rerank, diversify, max_per_file):
+        query_vectors = self._embed_queries(questions)
         
-        if len(query_vector) != self.vector_dim:
-            raise ValueError(
-                f"Query vector dimension ({len(query_vector)}) doesn't match "
-                f"index dimension ({self.vector_dim})"
-            )
+        for query_vector in query_vectors:
+            if len(query_vector) != self.vector_dim:
+                raise ValueError(
+                    f"Query vector dimension ({len(query_vector)}) doesn't match "
+                    f"index dimension ({self.vector_dim})"
+                )
         
-        results = self.faiss.search(query_vector, top_k=top_k)
+        hybrid = HYBRID_SEARCH if hybrid is None else hybrid
+        rerank = RERANK if rerank is None else rerank
+        diversify = MMR if diversify is None else diversify
+        # Reranking and MMR need a wider pool than top_k to have anything to choose from
+        pool = top_k
+        if rerank:
+            pool = max(pool, RERANK_CANDIDATES)
+        if diversify:
+            pool = max(pool, MMR_CANDIDATES)
+        candidates = max(pool, HYBRID_CANDIDATES) if hybrid else pool
+
+        batch_results = self.faiss.search_batch(
+            query_vectors,
+            top_k=candidates,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            filters=filters,
+        )
+
+        if hybrid:
+            batch_results = [
+                reciprocal_rank_fusion([
+                    vector_results,
+                    self.faiss.lexical_search(question, query_vector, top_k=candidates, filters=filters),
+                ])[:pool]
+                for question, query_vector, vector_results in zip(questions, query_vectors, batch_results)
+            ]
+
+        if rerank:
+            # One budget for the whole call; questions past it keep retrieval order
+            deadline = rerank_deadline()
+            batch_results = [
+                get_reranker().rerank(question, results, pool, deadline=deadline)
+                for question, results in zip(questions, batch_results)
+            ]
+
+        if diversify:
+            batch_results = [
+                self._diversify(query_vector, results, top_k, max_per_file)
+                for query_vector, results in zip(query_vectors, batch_results)
+            ]
+        else:
+            batch_results = [results[:top_k] for results in batch_results]
 
         if intent == "location":
-            results = _prioritize_function_chunks(question, results)
+            batch_results = [
+                _prioritize_function_chunks(question, results)
+                for question, results in zip(questions, batch_results)
+            ]
         
-        return results
+        return batch_results
+
+    def _diversify(self, query_vector, results, top_k, max_per_file=None):
+        if len(results) <= 1:
+            return results
+
+        vectors = self.faiss.reconstruct([chunk_uid(chunk["file"], chunk["chunk_id"]) for chunk in results])
+        relevance = None
+        if all("rerank_score" in chunk for chunk in results):
+            # Keep the cross-encoder's judgement of relevance, scaled to [0, 1]
+            scores = np.array([chunk["rerank_score"] for chunk in results], dtype="float32")
+            relevance = (scores - scores.min()) / max(float(np.ptp(scores)), 1e-6)
+
+        selected = mmr_select(
+            query_vector,
+            vectors,
+            top_k,
+            relevance=relevance,
+            files=[chunk["file"] for chunk in results],
+            max_per_file=MMR_MAX_PER_FILE if max_per_file is None else max_per_file or None,
+        )
+        return [results[i] for i in selected]
+
+    def _embed_queries(self, questions):
+        texts = [normalize_question(question) for question in questions]
+        vectors = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            query_vector = _query_vector_cache.get((self.model_name, text))
+            if query_vector is None:
+                missing.append(text)
+            else:
+                vectors[text] = query_vector
+
+        if len(missing) == 1:
+            vectors[missing[0]] = embed_query(missing[0], model_name=self.model_name)
+        elif missing:
+            vectors.update(zip(missing, embed_texts(missing, show_progress_bar=False, model_name=self.model_name)))
+
+        for text in missing:
+            _query_vector_cache.put((self.model_name, text), vectors[text])
+
+        return [vectors[text] for text in texts]
+
+    def cached_query_vector(self, question):
+        return _query_vector_cache.peek((self.model_name, normalize_question(question)))
+
+
+def query_cache_stats():
+    return _query_vector_cache.stats()
+
+
+def reciprocal_rank_fusion(result_lists, k=RRF_K):
+    fused = {}
+    for results in result_lists:
+        for rank, result in enumerate(results):
+            key = (result["file"], result["chunk_id"])
+            if key not in fused:
+                fused[key] = dict(result, fusion_score=0.0)
+            else:
+                fused[key].update((field, value) for field, value in result.items() if field not in fused[key])
+            fused[key]["fusion_score"] += 1.0 / (k + rank + 1)
+
+    return sorted(fused.values(), key=lambda r: (-r["fusion_score"], r["distance"]))
 
 
 def _tokenize_query(text):
@@ -79,8 +286,9 @@ def _prioritize_function_chunks(question, results):
 
     function_chunks.sort(key=lambda item: item[0], reverse=True)
     prioritized = [chunk for score, chunk in function_chunks if score > 0]
+    unmatched = [chunk for score, chunk in function_chunks if score == 0]
 
-    return prioritized + other_chunks
+    return prioritized + other_chunks + unmatched
 
 
 if __name__ == "__main__":
@@ -90,18 +298,24 @@ if __name__ == "__main__":
     sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "generator"))
     
     from query_decomposer import QueryDecomposer
+    from retrieval_planner import RetrievalPlanner
     from safety_check import SafetyCheck
     from prompt_builder import build_prompt
     from answer_generator import AnswerGenerator
+    from search_filters import parse_filter_query
     
     parser = argparse.ArgumentParser(description="Full RAG pipeline: Question to Answer")
-    parser.add_argument("question", help="The question to search for")
+    parser.add_argument("question", help="The question to search for (may contain path:/lang:/type:/symbol: filters)")
     parser.add_argument(
         "--top-k",
         type=int,
-        default=5,
-        help="Number of top results to return (default: 5)"
+        help="Number of top results to return (default: chosen by question intent)"
     )
+    parser.add_argument("--nprobe", type=int, help="IVF lists to probe (IVF indexes only)")
+    parser.add_argument("--ef-search", type=int, help="HNSW search depth (HNSW indexes only)")
+    parser.add_argument("--no-hybrid", action="store_true", help="Vector search only, without lexical fusion")
+    parser.add_argument("--rerank", action="store_true", help="Rerank candidates with a cross-encoder")
+    parser.add_argument("--no-mmr", action="store_true", help="Keep ranked order instead of diversifying results")
     parser.add_argument(
         "--index-path",
         type=str,
@@ -109,6 +323,7 @@ if __name__ == "__main__":
     )
     
     args = parser.parse_args()
+    args.question, filters = parse_filter_query(args.question)
     
     print("\n" + "=" * 80)
     print("RepoPilotAI - Full RAG Pipeline")
@@ -125,15 +340,27 @@ if __name__ == "__main__":
 
         print("🔍 Step 2: Retrieving relevant code chunks...")
         retriever = Retriever(faiss_index_path=args.index_path)
-        print(f"   ✓ Loaded FAISS index (dimension: {retriever.vector_dim})")
-        print(f"   ✓ Index contains {retriever.faiss.index.ntotal} vectors")
+        print(f"   ✓ Loaded FAISS index (dimension: {retriever.vector_dim}, model: {retriever.model_name})")
+        print(f"   ✓ Index contains {retriever.faiss.ntotal} vectors")
         
-        chunks = retriever.retrieve(args.question, top_k=args.top_k, intent=question_type.get("intent"))
+        planner = RetrievalPlanner()
+        plan = planner.plan(question_type, top_k=args.top_k, filters=filters)
+        print(f"   ✓ Retrieval plan: top_k={plan['top_k']}, fallback sources={len(plan['fallback_filters'])}")
+        chunks = planner.execute(
+            retriever,
+            args.question,
+            plan,
+            nprobe=args.nprobe,
+            ef_search=args.ef_search,
+            hybrid=False if args.no_hybrid else None,
+            rerank=True if args.rerank else None,
+            diversify=False if args.no_mmr else None,
+        )
         print(f"   ✓ Found {len(chunks)} relevant chunks\n")
         
         print("🛡️  Step 3: Safety check...")
         safety_checker = SafetyCheck()
-        safety_result = safety_checker.check(question_type, chunks)
+        safety_result = safety_checker.check(question_type, chunks, score_stats=retriever.score_stats)
         
         if not safety_result['allowed']:
             print(f"   ❌ Safety check FAILED: {safety_result['reason']}")
@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+SEMANTIC_CACHE_PROBE = 5
+
+
+def chunk_set_key(intent, chunks):
+    return (intent, tuple(sorted((chunk.get("file"), chunk.get("chunk_id")) for chunk in chunks)))
+
+
+class _VersionCache:
+    def __init__(self, index_version, dim):
+        import faiss
+
+        self.index_version = index_version
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.entries = OrderedDict()
+        self.next_id = 0
+
+
+class SemanticAnswerCache:
+    # Past question embeddings per repo, scoped to the index version they were answered against
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_size=SEMANTIC_CACHE_SIZE):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.threshold = threshold
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._repos = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector):
+        import faiss
+
+        vector = np.asarray(vector, dtype="float32").reshape(1, -1).copy()
+        faiss.normalize_L2(vector)
+        return vector
+
+    def get(self, repo, index_version, query_vector, chunk_key):
+        vector = self._normalize(query_vector)
+        with self._lock:
+            cache = self._repos.get(repo)
+            if cache is None or cache.index_version != index_version or cache.index.d != vector.shape[1] or not cache.entries:
+                self.misses += 1
+                return None
+
+            similarities, ids = cache.index.search(vector, min(SEMANTIC_CACHE_PROBE, len(cache.entries)))
+            for similarity, entry_id in zip(similarities[0], ids[0]):
+                if entry_id < 0 or similarity < self.threshold:
+                    break
+                entry = cache.entries.get(int(entry_id))
+                # A close paraphrase only counts if it was answered from exactly the same chunks
+                if entry is not None and entry[0] == chunk_key:
+                    cache.entries.move_to_end(int(entry_id))
+                    self.hits += 1
+                    return {**entry[1], "similarity": round(float(similarity), 4)}
+
+            self.misses += 1
+            return None
+
+    def put(self, repo, index_version, query_vector, chunk_key, question, body):
+        vector = self._normalize(query_vector)
+        with self._lock:
+            cache = self._repos.get(repo)
+            if cache is None or cache.index_version != index_version or cache.index.d != vector.shape[1]:
+                cache = _VersionCache(index_version, vector.shape[1])
+                self._repos[repo] = cache
+
+            entry_id = cache.next_id
+            cache.next_id += 1
+            cache.index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            cache.entries[entry_id] = (chunk_key, {"question": question, "body": body})
+
+            if len(cache.entries) > self.max_size:
+                evicted = [cache.entries.popitem(last=False)[0] for _ in range(len(cache.entries) - self.max_size)]
+                cache.index.remove_ids(np.array(evicted, dtype="int64"))
+
+    def invalidate(self, repo, index_version=None):
+        with self._lock:
+            cache = self._repos.get(repo)
+            if cache is not None and cache.index_version != index_version:
+                del self._repos[repo]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "repos": len(self._repos),
+                "size": sum(len(cache.entries) for cache in self._repos.values()),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
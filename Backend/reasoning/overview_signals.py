@@ -1,5 +1,6 @@
 import os
 import re
+from collections import Counter
 
 
 FRAMEWORK_HINTS = {
@@ -18,7 +19,9 @@ FRAMEWORK_HINTS = {
 EXTENSION_LANG = {
     ".py": "Python",
     ".js": "JavaScript",
+    ".jsx": "JavaScript",
     ".ts": "TypeScript",
+    ".tsx": "TypeScript",
     ".java": "Java",
     ".cs": "C#",
     ".cpp": "C++",
@@ -49,6 +52,13 @@ STOPWORDS = {
 }
 
 
+_FRAMEWORK_PATTERNS = {
+    framework: re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags=re.IGNORECASE)
+    for framework, patterns in FRAMEWORK_HINTS.items()
+}
+_ENTITY_PATTERN = re.compile(r"\b(class|struct|interface|enum)\s+(\w+)")
+
+
 def _tokenize(text):
     tokens = re.split(r"[^A-Za-z0-9]+", text)
     return [t.lower() for t in tokens if t and len(t) >= 3]
@@ -64,22 +74,20 @@ def _extract_keywords(file_paths):
 
 def _extract_entities(chunks):
     entities = []
-    pattern = re.compile(r"\b(class|struct|interface|enum)\s+(\w+)")
     for chunk in chunks:
         text = chunk.get("text", "")
-        for _, name in pattern.findall(text):
+        for _, name in _ENTITY_PATTERN.findall(text):
             entities.append(name)
     return entities
 
 
 def _detect_frameworks(chunks):
     found = set()
-    texts = "\n".join(chunk.get("text", "") for chunk in chunks)
-    for framework, patterns in FRAMEWORK_HINTS.items():
-        for pattern in patterns:
-            if re.search(pattern, texts, flags=re.IGNORECASE):
+    for chunk in chunks:
+        text = chunk.get("text", "")
+        for framework, pattern in _FRAMEWORK_PATTERNS.items():
+            if framework not in found and pattern.search(text):
                 found.add(framework)
-                break
     return sorted(found)
 
 
@@ -137,3 +145,50 @@ def extract_overview_signals(chunks):
         "top_level_dirs": top_dirs,
         "keywords": top_keywords,
     }
+
+
+def build_repo_profile(chunks, top_keywords=20):
+    # Same signals as extract_overview_signals, computed once over every chunk
+    # at index time and stored with the index
+    files = {}
+    chunk_count = 0
+    entities = Counter()
+    frameworks = set()
+    for chunk in chunks:
+        chunk_count += 1
+        text = chunk.get("text", "")
+        if chunk.get("file"):
+            files.setdefault(chunk["file"], None)
+        for _, name in _ENTITY_PATTERN.findall(text):
+            entities[name.lower()] += 1
+        for framework, pattern in _FRAMEWORK_PATTERNS.items():
+            if framework not in frameworks and pattern.search(text):
+                frameworks.add(framework)
+
+    file_paths = list(files)
+    language_files = Counter(
+        EXTENSION_LANG[ext]
+        for ext in (os.path.splitext(path)[1].lower() for path in file_paths)
+        if ext in EXTENSION_LANG
+    )
+    dir_files = Counter(
+        path.replace("\\", "/").split("/", 1)[0]
+        for path in file_paths
+        if "/" in path.replace("\\", "/")
+    )
+
+    keyword_freq = Counter(_extract_keywords(file_paths)) + entities
+    for word in STOPWORDS:
+        keyword_freq.pop(word, None)
+
+    return {
+        "languages": [lang for lang, _ in language_files.most_common()],
+        "language_files": dict(language_files.most_common()),
+        "frameworks": sorted(frameworks),
+        "entry_points": _entry_points(file_paths),
+        "top_level_dirs": sorted(dir_files),
+        "dir_files": dict(dir_files.most_common()),
+        "keywords": [word for word, _ in keyword_freq.most_common(top_keywords)],
+        "file_count": len(file_paths),
+        "chunk_count": chunk_count,
+    }
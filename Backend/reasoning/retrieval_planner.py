@@ -0,0 +1,114 @@
+class RetrievalPlanner:
+    def __init__(self):
+        # Narrow questions fetch and prompt with few chunks; broad ones trade
+        # latency for coverage. None means "use the retriever's default",
+        # max_per_file=0 turns the per-file cap off.
+        self.intent_plans = {
+            "location": {
+                "top_k": 3,
+                "hybrid": True,
+                "rerank": False,
+                "diversify": False,
+                "max_per_file": None,
+                "expand_tokens": 300,
+            },
+            "explanation": {
+                "top_k": 5,
+                "hybrid": True,
+                "rerank": None,
+                "diversify": True,
+                "max_per_file": 2,
+                "expand_tokens": 1500,
+            },
+            "impact": {
+                "top_k": 8,
+                "hybrid": True,
+                "rerank": None,
+                "diversify": True,
+                "max_per_file": 2,
+                "expand_tokens": 2000,
+            },
+            "overview": {
+                "top_k": 10,
+                "hybrid": False,
+                "rerank": False,
+                "diversify": True,
+                "max_per_file": 1,
+                "expand_tokens": 0,
+            },
+            "unknown": {
+                "top_k": 5,
+                "hybrid": None,
+                "rerank": None,
+                "diversify": None,
+                "max_per_file": None,
+                "expand_tokens": None,
+            },
+        }
+        # File name filters, so a backend/app.py or frontend/README.md is found in any directory
+        self.fallback_sources = {
+            "README": {"name": ["readme"]},
+            "entry_points": {
+                "name": ["main.py", "app.py", "manage.py", "main.js", "main.ts", "index.js", "index.ts", "server.js", "server.ts"],
+            },
+        }
+        self.fallback_top_k = 2
+
+    def plan(self, question_type, top_k=None, filters=None):
+        intent = question_type.get("intent", "unknown")
+        plan = dict(self.intent_plans.get(intent, self.intent_plans["unknown"]))
+        plan["intent"] = intent
+        if top_k is not None:
+            if isinstance(top_k, bool) or not str(top_k).strip().isdigit() or int(top_k) < 1:
+                raise ValueError("top_k must be a positive integer")
+            plan["top_k"] = int(top_k)
+        plan["filters"] = filters or None
+        if filters and plan["max_per_file"]:
+            # A path or file scope may cover a single file; capping it would only starve the answer
+            plan["max_per_file"] = 0
+
+        # Fallback sources only widen unscoped questions; a user filter wins
+        plan["fallback_filters"] = []
+        if not filters:
+            plan["fallback_filters"] = [
+                self.fallback_sources[source]
+                for source in question_type.get("allow_fallback_sources", [])
+                if source in self.fallback_sources
+            ]
+        return plan
+
+    def execute(self, retriever, question, plan, nprobe=None, ef_search=None, **overrides):
+        options = {
+            field: plan[field]
+            for field in ("hybrid", "rerank", "diversify", "max_per_file", "expand_tokens")
+        }
+        options.update((field, value) for field, value in overrides.items() if value is not None)
+
+        chunks = retriever.retrieve(
+            question,
+            top_k=plan["top_k"],
+            intent=plan["intent"],
+            nprobe=nprobe,
+            ef_search=ef_search,
+            filters=plan["filters"],
+            **options,
+        )
+
+        seen = {(chunk["file"], chunk["chunk_id"]) for chunk in chunks}
+        extra = []
+        for filters in plan["fallback_filters"]:
+            for chunk in retriever.retrieve(
+                question,
+                top_k=self.fallback_top_k,
+                filters=filters,
+                hybrid=False,
+                diversify=False,
+                expand_tokens=0,
+            ):
+                if (chunk["file"], chunk["chunk_id"]) not in seen:
+                    seen.add((chunk["file"], chunk["chunk_id"]))
+                    extra.append(chunk)
+
+        # Fallback chunks take the place of the weakest retrieved ones
+        keep = max(plan["top_k"] - len(extra), 0)
+        return chunks[:keep] + extra[:plan["top_k"]]
@@ -1,10 +1,24 @@
 class SafetyCheck:
-    def __init__(self, min_chunks=2, min_text_length=50, max_distance=1.6):
+    def __init__(self, min_chunks=2, min_text_length=50, max_distance=1.6, calibrated_range=(0.2, 4.0)):
         self.min_chunks = min_chunks
         self.min_text_length = min_text_length
         self.max_distance = max_distance
+        # Bounds for a calibrated threshold, as squared L2 between unit vectors (0 = identical,
+        # 4 = opposite): a degenerate calibration must neither refuse everything nor nothing
+        self.calibrated_range = calibrated_range
     
-    def check(self, question_type, retrieved_chunks):
+    def distance_threshold(self, score_stats=None):
+        score_stats = score_stats or {}
+        # Distances are squared L2 between unit vectors, twice the cosine distance
+        scale = 0.5 if score_stats.get("metric") == "cosine" else 1.0
+
+        threshold = score_stats.get("threshold")
+        if threshold:
+            low, high = self.calibrated_range
+            return min(max(threshold["value"], low * scale), high * scale)
+        return self.max_distance * scale
+
+    def check(self, question_type, retrieved_chunks, score_stats=None):
         if not isinstance(retrieved_chunks, list):
             return {
                 "allowed": False,
@@ -17,7 +31,10 @@ class SafetyCheck:
                 "reason": "No relevant code chunks found in the repository"
             }
         
-        if len(retrieved_chunks) < self.min_chunks:
+        # A definition found by exact name is all a location question needs
+        symbol_hit = question_type.get("intent") == "location" and retrieved_chunks[0].get("symbol_match") == "exact"
+
+        if len(retrieved_chunks) < self.min_chunks and not symbol_hit:
             return {
                 "allowed": False,
                 "reason": f"Not enough context (found {len(retrieved_chunks)}, need at least {self.min_chunks})"
@@ -38,7 +55,7 @@ class SafetyCheck:
         strict_retrieval = question_type.get("strict_retrieval", True)
         if strict_retrieval and "distance" in retrieved_chunks[0]:
             avg_distance = sum(c.get("distance", 0) for c in retrieved_chunks) / len(retrieved_chunks)
-            if avg_distance > self.max_distance:
+            if avg_distance > self.distance_threshold(score_stats):
                 return {
                     "allowed": False,
                     "reason": f"Retrieved chunks are not relevant enough (avg distance: {avg_distance:.2f})"
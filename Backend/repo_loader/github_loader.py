@@ -4,7 +4,7 @@ import re
 import shutil
 import tempfile
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 import requests
 
@@ -138,13 +138,13 @@ def _format_github_error(prefix: str, response: requests.Response) -> str:
 	return " | ".join(parts)
 
 
-def load_github_repo(repo_url: str) -> Dict[str, str]:
+def load_github_repo(repo_url: str, ref: Optional[str] = None) -> Dict[str, str]:
 	if not repo_url or not isinstance(repo_url, str):
 		raise ValueError("repo_url must be a non-empty string")
 
 	repo_info = _parse_repo_url(repo_url)
 	headers = _github_headers()
-	branch = _get_default_branch(repo_info["owner"], repo_info["repo"], headers)
+	branch = ref or _get_default_branch(repo_info["owner"], repo_info["repo"], headers)
 
 	backend_dir = Path(__file__).resolve().parents[1]
 	repo_temp_dir = backend_dir / "data" / "repo_temp"
@@ -194,7 +194,13 @@ def load_github_repo(repo_url: str) -> Dict[str, str]:
 		shutil.rmtree(temp_path, ignore_errors=True)
 		raise
 
-	return {"temp_path": str(temp_path), "files_count": files_count}
+	return {
+		"temp_path": str(temp_path),
+		"files_count": files_count,
+		"owner": repo_info["owner"],
+		"repo": repo_info["repo"],
+		"ref": branch,
+	}
 
 
 if __name__ == "__main__":
@@ -202,7 +208,8 @@ if __name__ == "__main__":
 
 	parser = argparse.ArgumentParser(description="Download a GitHub repo into a temp folder.")
 	parser.add_argument("repo_url", help="GitHub repository URL")
+	parser.add_argument("--ref", help="Branch, tag or commit to download (defaults to the default branch)")
 	args = parser.parse_args()
 
-	result = load_github_repo(args.repo_url)
+	result = load_github_repo(args.repo_url, ref=args.ref)
 	print(result)
@@ -0,0 +1,39 @@
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("vector_db", "rag", "reasoning"):
+    sys.path.insert(0, os.path.join(BASE_DIR, folder))
+
+
+@pytest.fixture
+def make_chunks():
+    # Embedded chunks with seeded random vectors; per_file consecutive chunks share "f<n>.py"
+    # (spread round-robin over dirs when given), or files names every chunk's file explicitly
+    def make(count=200, dim=16, per_file=10, seed=0, dirs=None, files=None, text=lambda i: f"t{i}", vectors=True):
+        if files is not None:
+            count = len(files)
+        rows = np.random.default_rng(seed).normal(size=(count, dim)).astype("float32")
+        seen = Counter()
+        chunks = []
+        for i in range(count):
+            if files is not None:
+                file = files[i]
+                chunk_id = seen[file]
+                seen[file] += 1
+            else:
+                file = f"f{i // per_file}.py"
+                chunk_id = i % per_file
+                if dirs:
+                    file = f"{dirs[i % len(dirs)]}/{file}"
+            chunk = {"file": file, "chunk_id": chunk_id, "text": text(i)}
+            if vectors:
+                chunk["vector"] = rows[i].tolist()
+            chunks.append(chunk)
+        return chunks
+
+    return make
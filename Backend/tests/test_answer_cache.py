@@ -0,0 +1,50 @@
+import sqlite3
+import time
+
+from answer_cache import ANSWER_CACHE_FILE, AnswerCache, answer_key, config_fingerprint
+
+
+def test_publishing_a_new_version_retires_old_answers(tmp_path):
+    cache = AnswerCache(cache_dir=str(tmp_path))
+    old_key = answer_key("repo", "v1/faiss_index", "How does search work?")
+    other_key = answer_key("other", "v1/faiss_index", "How does search work?")
+    cache.put(old_key, {"answer": "old"}, repo="repo", index_version="v1/faiss_index")
+    cache.put(other_key, {"answer": "other"}, repo="other", index_version="v1/faiss_index")
+
+    assert answer_key("repo", "v2/faiss_index", "How does search work?") != old_key
+    cache.invalidate("repo", "v2/faiss_index")
+    assert cache.get(old_key) is None
+    assert cache.get(other_key) == {"answer": "other"}
+
+    restarted = AnswerCache(cache_dir=str(tmp_path))
+    assert restarted.get(old_key) is None
+    assert restarted.get(other_key) == {"answer": "other"}
+
+
+def test_fingerprint_tracks_settings_and_prompt_sources(tmp_path):
+    template = tmp_path / "prompt_builder.py"
+    template.write_text("PROMPT = 'v1'\n")
+    settings = {"generator_model": "gemini-2.5-flash", "rerank": [False]}
+    fingerprint = config_fingerprint(settings, sources=[str(template)])
+
+    assert config_fingerprint(dict(settings), sources=[str(template)]) == fingerprint
+    assert config_fingerprint({**settings, "generator_model": "gemini-2.5-pro"}, sources=[str(template)]) != fingerprint
+    assert config_fingerprint({**settings, "rerank": [True]}, sources=[str(template)]) != fingerprint
+    template.write_text("PROMPT = 'v2'\n")
+    assert config_fingerprint(settings, sources=[str(template)]) != fingerprint
+
+    key = answer_key("repo", "v1", "question", fingerprint="a")
+    assert answer_key("repo", "v1", "question", fingerprint="b") != key
+    assert answer_key("repo", "v1", "  question ", fingerprint="a") == key
+
+
+def test_disk_entries_expire(tmp_path):
+    key = answer_key("repo", "v1", "question")
+    AnswerCache(cache_dir=str(tmp_path)).put(key, {"answer": "stale"}, repo="repo", index_version="v1")
+    conn = sqlite3.connect(str(tmp_path / ANSWER_CACHE_FILE))
+    conn.execute("UPDATE answers SET created_at = ?", (time.time() - 3600,))
+    conn.commit()
+    conn.close()
+
+    assert AnswerCache(cache_dir=str(tmp_path), disk_ttl_seconds=None).get(key) == {"answer": "stale"}
+    assert AnswerCache(cache_dir=str(tmp_path), disk_ttl_seconds=60).get(key) is None
@@ -0,0 +1,87 @@
+import os
+import re
+import threading
+
+import pytest
+
+from code_search import CODE_SEARCH_MAX_PATTERN, CodeSearchIndex
+
+
+FILES = {
+    "app.py": "import os\n\ndef create_app():\n    return Flask(__name__)\n",
+    "vector_db/faiss_index.py": "class FaissIndex:\n    def search(self, vector, top_k=5):\n        return self.index.search(vector, top_k)\n",
+    "vector_db/chunk_store.py": "class ChunkStore:\n    def get_many(self, ids):\n        return [self.get(i) for i in ids]\n",
+    "reasoning/safety_check.py": "class SafetyCheck:\n    MAX_DISTANCE = 1.6\n",
+    "README.md": "# Repo\n\nRun create_app() then call /search?q=FaissIndex\n",
+    "short.txt": "ab\n",
+}
+
+QUERIES = [
+    ("FaissIndex", False, False),
+    ("faissindex", False, False),
+    ("faissindex", False, True),
+    ("def \\w+\\(self", True, False),
+    ("ChunkStore|SafetyCheck", True, False),
+    ("(create|get)_(app|many)", True, False),
+    ("top_k=\\d+", True, False),
+    ("a.", True, False),
+]
+
+
+@pytest.fixture(scope="module")
+def code_index(tmp_path_factory):
+    repo = tmp_path_factory.mktemp("repo")
+    for path, content in FILES.items():
+        os.makedirs(os.path.dirname(repo / path), exist_ok=True)
+        (repo / path).write_text(content)
+    return CodeSearchIndex.build(str(tmp_path_factory.mktemp("index") / "faiss_index"), str(repo), set(FILES))
+
+
+def _full_scan(query, regex, case_sensitive):
+    pattern = re.compile(query if regex else re.escape(query), re.MULTILINE | (0 if case_sensitive else re.IGNORECASE))
+    return {path for path, content in FILES.items() if pattern.search(content)}
+
+
+@pytest.mark.parametrize("query,regex,case_sensitive", QUERIES)
+def test_trigram_search_finds_the_same_files_as_a_full_scan(code_index, query, regex, case_sensitive):
+    result = code_index.search(query, regex=regex, case_sensitive=case_sensitive)
+    assert {match["file"] for match in result["matches"]} == _full_scan(query, regex, case_sensitive)
+    assert not result["truncated"]
+
+
+def test_literal_queries_narrow_on_trigrams(code_index):
+    result = code_index.search("ChunkStore")
+    assert result["indexed"]
+    assert result["candidates"] < len(FILES)
+
+
+def test_max_results_truncates(code_index):
+    result = code_index.search("return", max_results=1)
+    assert len(result["matches"]) == 1
+    assert result["truncated"]
+
+
+def test_search_from_other_threads_shares_the_connection(code_index):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(code_index.search("FaissIndex"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [len(result["matches"]) for result in results] == [len(code_index.search("FaissIndex")["matches"])] * 4
+
+
+def test_long_patterns_are_rejected(code_index):
+    with pytest.raises(ValueError):
+        code_index.search("a" * (CODE_SEARCH_MAX_PATTERN + 1), regex=True)
+
+
+def test_queries_scanning_too_many_files_are_rejected(code_index):
+    # "a." has no trigram to narrow on, so it would run over every file
+    with pytest.raises(ValueError):
+        code_index.search("a.", regex=True, max_scan=3)
+    with pytest.raises(ValueError):
+        code_index.search("a.", regex=True, path="vector_db", max_scan=1)
+
+    result = code_index.search("a.", regex=True, path="vector_db", max_scan=2)
+    assert {match["file"] for match in result["matches"]} == {"vector_db/faiss_index.py", "vector_db/chunk_store.py"}
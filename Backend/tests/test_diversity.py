@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from diversity import mmr_select
+
+
+def _candidates(count=12, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype("float32")
+
+
+def test_pure_relevance_keeps_the_ranking():
+    vectors = _candidates()
+    relevance = np.linspace(1, 0, len(vectors))
+    assert mmr_select(vectors[0], vectors, 5, lambda_=1.0, relevance=relevance) == [0, 1, 2, 3, 4]
+
+
+def test_near_duplicates_give_way_to_diverse_candidates():
+    base = _candidates(count=2)
+    vectors = np.stack([base[0], base[0] + 1e-3, base[1]])
+    assert mmr_select(base[0], vectors, 2, lambda_=0.5, relevance=[1.0, 0.99, 0.6]) == [0, 2]
+
+
+def test_per_file_cap_spreads_results_across_files():
+    vectors = _candidates()
+    files = ["a.py"] * 6 + ["b.py"] * 3 + ["c.py"] * 3
+    relevance = np.linspace(1, 0, len(vectors))
+    selected = mmr_select(vectors[0], vectors, 6, lambda_=1.0, relevance=relevance, files=files, max_per_file=2)
+    assert [files[i] for i in selected].count("a.py") == 2
+    assert {files[i] for i in selected} == {"a.py", "b.py", "c.py"}
+
+
+@pytest.mark.parametrize("files", [["app.py"] * 12, ["app.py"] * 10 + ["b.py"] * 2])
+@pytest.mark.parametrize("top_k", [1, 8, 12, 20])
+def test_capped_files_refill_up_to_top_k(files, top_k):
+    vectors = _candidates()
+    selected = mmr_select(vectors[0], vectors, top_k, files=files, max_per_file=1)
+    assert len(selected) == min(top_k, len(vectors))
+    assert len(set(selected)) == len(selected)
+    # Capped candidates only come back after every other file has had its turn
+    assert len({files[i] for i in selected[:len(set(files))]}) == min(len(set(files)), top_k)
@@ -0,0 +1,67 @@
+import numpy as np
+
+from expansion import expand_chunks
+from faiss_index import FaissIndex
+
+SOURCE = [
+    "def outer(items):",
+    "    total = 0",
+    "    def add(item):",
+    "        return item * 2",
+    "    for item in items:",
+    "        total += add(item)",
+    "    return total",
+    "def after():",
+    "    return outer([1, 2])",
+]
+
+# Python function chunks as the chunker emits them: "add" sits inside "outer"
+SPANS = [("outer", 1, 7), ("add", 3, 4), ("after", 8, 9)]
+
+
+def build_index(tmp_path):
+    index = FaissIndex(index_path=str(tmp_path / "index.faiss"), index_type="flat")
+    vectors = np.random.default_rng(0).normal(size=(len(SPANS), 8)).astype("float32")
+    index.add([
+        {
+            "file": "app.py",
+            "chunk_id": chunk_id,
+            "text": "\n".join(SOURCE[start - 1:end]),
+            "chunk_type": "function",
+            "symbol_name": name,
+            "start_line": start,
+            "end_line": end,
+            "vector": vector.tolist(),
+        }
+        for chunk_id, ((name, start, end), vector) in enumerate(zip(SPANS, vectors))
+    ])
+    index.save()
+    index.load(mmap=False)
+    return index
+
+
+def chunk_named(index, name):
+    return next(chunk for _, chunk in index.store.iter_rows() if chunk["symbol_name"] == name)
+
+
+def test_nested_function_lines_appear_once(tmp_path):
+    index = build_index(tmp_path)
+    expanded = expand_chunks(index, [chunk_named(index, "outer")], token_budget=1000)[0]
+    assert expanded["text"].split("\n") == SOURCE
+    assert expanded["expanded_chunk_ids"] == [0, 1, 2]
+    assert (expanded["start_line"], expanded["end_line"]) == (1, 9)
+
+
+def test_nested_hit_grows_to_its_enclosing_function(tmp_path):
+    index = build_index(tmp_path)
+    expanded = expand_chunks(index, [chunk_named(index, "add")], token_budget=1000)[0]
+    assert expanded["text"].split("\n") == SOURCE[:7]
+    assert expanded["text"].count("def add") == 1
+
+
+def test_already_merged_lines_do_not_spend_the_budget(tmp_path):
+    index = build_index(tmp_path)
+    budget = len("\n".join(SOURCE[7:])) // 4 + 1
+
+    expanded = expand_chunks(index, [chunk_named(index, "outer")], token_budget=budget)[0]
+    assert expanded["text"].split("\n") == SOURCE
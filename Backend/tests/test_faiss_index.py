@@ -0,0 +1,89 @@
+import os
+
+from faiss_index import FaissIndex, chunk_uid
+
+
+def search_files(index, vector, top_k=20):
+    return {result["file"] for result in index.search(vector, top_k)}
+
+
+def test_hnsw_remove_uses_sentinel_ids_and_hides_removed_chunks(tmp_path, make_chunks):
+    chunks = make_chunks()
+    index = FaissIndex(index_path=str(tmp_path / "index.faiss"), index_type="hnsw")
+    index.add(chunks)
+    index.save()
+
+    index = FaissIndex(index_path=str(tmp_path / "index.faiss"))
+    index.load(mmap=False)
+    assert index.remove_by_file("f0.py") == 10
+
+    assert len(index.tombstones) == 10
+    assert all(uid <= -2 for uid in index.tombstones)
+    assert index.ntotal == 190
+    assert "f0.py" not in search_files(index, chunks[3]["vector"])
+
+    # The freed chunk ids can be reused straight away
+    index.upsert_chunks([dict(chunks[3], text="NEW")])
+    assert index.search(chunks[3]["vector"], 1)[0]["text"] == "NEW"
+
+
+def test_hnsw_tombstones_survive_save_and_load(tmp_path, make_chunks):
+    path = str(tmp_path / "index.faiss")
+    index = FaissIndex(index_path=path, index_type="hnsw")
+    index.add(make_chunks())
+    index.remove_by_file("f1.py")
+    index.save()
+
+    loaded = FaissIndex(index_path=path)
+    loaded.load()
+    assert loaded.tombstones == index.tombstones
+    assert loaded.ntotal == 190
+    assert loaded.store.count() == 190
+    assert "f1.py" not in search_files(loaded, make_chunks()[15]["vector"])
+
+
+def test_save_compacts_once_enough_vectors_are_removed(tmp_path, make_chunks):
+    path = str(tmp_path / "index.faiss")
+    chunks = make_chunks()
+    index = FaissIndex(index_path=path, index_type="hnsw")
+    index.add(chunks)
+    index.remove_files([f"f{i}.py" for i in range(15)])
+    index.save()
+
+    loaded = FaissIndex(index_path=path)
+    loaded.load()
+    assert loaded.tombstones == set()
+    assert loaded.index.ntotal == loaded.store.count() == 50
+    results = loaded.search(chunks[180]["vector"], 1)
+    assert results[0]["text"] == "t180"
+    assert set(loaded.live_ids().tolist()) == {chunk_uid(c["file"], c["chunk_id"]) for c in chunks[150:]}
+
+
+def test_flat_remove_deletes_without_tombstones(tmp_path, make_chunks):
+    chunks = make_chunks()
+    index = FaissIndex(index_path=str(tmp_path / "index.faiss"), index_type="flat")
+    index.add(chunks)
+    assert index.remove_by_file("f2.py") == 10
+    assert index.tombstones == set()
+    assert index.index.ntotal == 190
+    assert "f2.py" not in search_files(index, chunks[25]["vector"])
+
+
+def test_rebuilding_in_place_leaves_mmapped_readers_intact(tmp_path, make_chunks):
+    path = str(tmp_path / "index.faiss")
+    chunks = make_chunks()
+    index = FaissIndex(index_path=path, index_type="flat")
+    index.add(chunks)
+    index.save()
+
+    reader = FaissIndex(index_path=path)
+    reader.load(mmap=True)
+    assert reader.mmapped
+
+    rebuilt = FaissIndex(index_path=path, index_type="flat")
+    rebuilt.add(make_chunks(count=20, seed=1))
+    rebuilt.save()
+
+    # The reader keeps searching the file it mapped, not the truncated replacement
+    assert reader.search(chunks[150]["vector"], 1)[0]["text"] == "t150"
+    assert not os.path.exists(path + ".tmp") and not os.path.exists(path + ".meta.tmp")
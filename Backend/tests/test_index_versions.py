@@ -0,0 +1,32 @@
+import threading
+
+from faiss_index import FaissIndex
+from index_versions import current_index_path, new_version, publish_version
+
+
+def publish_index(index_dir, chunks):
+    version, path = new_version(index_dir)
+    index = FaissIndex(index_path=path, index_type="flat")
+    index.add(chunks)
+    index.save()
+    publish_version(index_dir, version, keep=1)
+    return path
+
+
+def test_loaded_version_keeps_serving_after_it_is_pruned(tmp_path, make_chunks):
+    index_dir = str(tmp_path)
+    chunks = make_chunks(20, dim=8, per_file=1, dirs=["v0"])
+    old_path = publish_index(index_dir, chunks)
+    reader = FaissIndex(index_path=old_path)
+    reader.load()
+
+    new_path = publish_index(index_dir, make_chunks(20, dim=8, per_file=1, seed=1, dirs=["v1"]))
+    assert current_index_path(index_dir) == new_path
+    assert not (tmp_path / "versions" / old_path.split("/")[-2]).exists()
+
+    # A request thread that never touched the old store before the prune
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(reader.search(chunks[3]["vector"], 1)))
+    thread.start()
+    thread.join()
+    assert results[0]["file"] == "v0/f3.py"
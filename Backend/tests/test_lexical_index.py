@@ -0,0 +1,57 @@
+import numpy as np
+
+from lexical_index import LexicalIndex
+
+ROWS = [
+    (101, {"file": "vector_db/faiss_index.py", "symbol_name": "FaissIndex", "text": "def search(self, vector): return hits"}),
+    (102, {"file": "rag/retriever.py", "symbol_name": "Retriever", "text": "lexical_search fused with vector hits"}),
+    (103, {"file": "docs/naïve.md", "text": "Überblick über die naïve Suche"}),
+    (104, {"file": "reasoning/safety_check.py", "symbol_name": "SafetyCheck", "text": "min_chunks and distance threshold"}),
+]
+
+
+def test_saved_index_is_memory_mapped_and_searches_the_same(tmp_path):
+    built = LexicalIndex.build(ROWS)
+    built.save(str(tmp_path / "index.lexical"))
+    loaded = LexicalIndex.load(str(tmp_path / "index.lexical"))
+
+    assert all(isinstance(getattr(loaded, name), np.memmap) for name in ("term_bytes", "postings", "doc_ids"))
+    for query in ("FaissIndex search", "safety check", "naïve Überblick", "retriever hits", "missing"):
+        assert loaded.search(query) == built.search(query)
+    assert loaded.search("SafetyCheck")[0][0] == 104
+    assert loaded.search("überblick")[0][0] == 103
+
+
+def test_resaving_in_place_keeps_open_readers_working(tmp_path):
+    path = str(tmp_path / "index.lexical")
+    LexicalIndex.build(ROWS).save(path)
+    reader = LexicalIndex.load(path)
+    LexicalIndex.build(ROWS[:1]).save(path)
+
+    assert reader.search("SafetyCheck")[0][0] == 104
+    assert LexicalIndex.load(path).search("SafetyCheck") == []
+
+
+def test_legacy_npz_indexes_still_load(tmp_path):
+    built = LexicalIndex.build(ROWS)
+    terms = [built._term(i).decode("utf-8") for i in range(len(built.term_offsets) - 1)]
+    path = str(tmp_path / "index.lexical")
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            terms=np.array(terms, dtype="U"),
+            offsets=built.offsets,
+            postings=built.postings,
+            freqs=built.freqs,
+            doc_ids=built.doc_ids,
+            doc_lengths=built.doc_lengths,
+        )
+
+    assert LexicalIndex.load(path).search("retriever lexical") == built.search("retriever lexical")
+    LexicalIndex.build(ROWS).save(path)
+    assert LexicalIndex.load(path).search("retriever lexical") == built.search("retriever lexical")
+
+
+def test_empty_index_round_trips(tmp_path):
+    LexicalIndex.build([]).save(str(tmp_path / "index.lexical"))
+    assert LexicalIndex.load(str(tmp_path / "index.lexical")).search("anything") == []
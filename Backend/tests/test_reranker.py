@@ -0,0 +1,45 @@
+import threading
+import time
+
+import numpy as np
+
+import reranker
+from reranker import Reranker, get_reranker
+
+
+class FakeCrossEncoder:
+    def predict(self, pairs, batch_size=8):
+        return np.array([float(len(text)) for _, text in pairs])
+
+
+def test_cold_model_keeps_retrieval_order_and_loads_in_background(make_chunks):
+    loaded = threading.Event()
+    model = Reranker()
+
+    def slow_load():
+        time.sleep(0.2)
+        model._model = FakeCrossEncoder()
+        loaded.set()
+        return model._model
+
+    model._get_model = slow_load
+    started = time.perf_counter()
+    chunks = make_chunks(6, per_file=1, text=lambda i: "x" * i, vectors=False)
+    assert model.rerank("q", chunks, 3, deadline=reranker.rerank_deadline(50)) == chunks[:3]
+    assert time.perf_counter() - started < 0.1
+    assert model.stats()["cold_fallbacks"] == 1
+
+    assert loaded.wait(2)
+    ranked = model.rerank("q", chunks, 3, deadline=reranker.rerank_deadline(1000))
+    assert [chunk["file"] for chunk in ranked] == ["f5.py", "f4.py", "f3.py"]
+
+
+def test_concurrent_first_calls_share_one_reranker(monkeypatch):
+    monkeypatch.setattr(reranker, "_reranker", None)
+    instances = []
+    threads = [threading.Thread(target=lambda: instances.append(get_reranker())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(instance) for instance in instances}) == 1
@@ -0,0 +1,68 @@
+import pytest
+
+import retriever as retriever_module
+from faiss_index import FaissIndex
+from retrieval_planner import RetrievalPlanner
+from retriever import Retriever
+
+FILES = ["backend/app.py", "frontend/README.md"] + [f"backend/services/s{i}.py" for i in range(30)]
+
+
+def build_retriever(path, chunks, monkeypatch, query_chunk):
+    index = FaissIndex(index_path=str(path), index_type="flat")
+    index.add(chunks)
+    index.save()
+    monkeypatch.setattr(retriever_module, "embed_query", lambda text, model_name=None: chunks[query_chunk]["vector"])
+    return Retriever(faiss_index=index)
+
+
+@pytest.fixture
+def retriever(tmp_path, monkeypatch, make_chunks):
+    # Questions land next to a service module, far from the fallback files
+    return build_retriever(tmp_path / "index.faiss", make_chunks(files=FILES), monkeypatch, query_chunk=10)
+
+
+def test_fallback_sources_match_files_in_any_directory(retriever):
+    planner = RetrievalPlanner()
+    question_type = {"intent": "overview", "allow_fallback_sources": ["README", "entry_points"]}
+    plan = planner.plan(question_type)
+    files = [chunk["file"] for chunk in planner.execute(retriever, "what does this repo do", plan)]
+
+    assert len(files) == plan["top_k"]
+    assert "frontend/README.md" in files
+    assert "backend/app.py" in files
+
+
+@pytest.mark.parametrize("top_k", ["abc", 0, -3, True, 2.5])
+def test_plan_rejects_invalid_top_k(top_k):
+    with pytest.raises(ValueError):
+        RetrievalPlanner().plan({"intent": "location"}, top_k=top_k)
+
+
+@pytest.fixture
+def app_retriever(tmp_path, monkeypatch, make_chunks):
+    files = ["backend/app.py"] * 10 + [f"backend/services/s{i}.py" for i in range(10)]
+    return build_retriever(tmp_path / "index.faiss", make_chunks(files=files, seed=1), monkeypatch, query_chunk=0)
+
+
+@pytest.mark.parametrize("intent", ["explanation", "impact", "overview"])
+def test_scoped_questions_are_not_capped_per_file(app_retriever, intent):
+    planner = RetrievalPlanner()
+    plan = planner.plan({"intent": intent}, top_k=8, filters={"path": ["backend/app.py"]})
+    chunks = planner.execute(app_retriever, "how are routes handled", plan)
+
+    assert plan["top_k"] == 8
+    assert plan["max_per_file"] == 0
+    assert len(chunks) == 8
+    assert {chunk["file"] for chunk in chunks} == {"backend/app.py"}
+
+
+def test_caller_top_k_is_kept_with_the_per_file_cap(app_retriever):
+    planner = RetrievalPlanner()
+    plan = planner.plan({"intent": "overview"}, top_k=4)
+    chunks = planner.execute(app_retriever, "what does this repo do", plan)
+
+    assert plan["top_k"] == 4
+    assert plan["max_per_file"] == 1
+    assert len(chunks) == 4
+    assert len({chunk["file"] for chunk in chunks}) == 4
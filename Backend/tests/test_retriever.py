@@ -0,0 +1,58 @@
+import pytest
+
+import retriever as retriever_module
+from faiss_index import FaissIndex
+from retriever import RRF_K, Retriever, reciprocal_rank_fusion
+
+
+def hit(file, distance, **fields):
+    return {"file": file, "chunk_id": 0, "distance": distance, **fields}
+
+
+def test_hits_found_by_both_searches_rank_first():
+    vector = [hit("a.py", 0.1), hit("both.py", 0.2), hit("b.py", 0.3)]
+    lexical = [hit("c.py", 0.9, lexical_score=5.0), hit("both.py", 0.2, lexical_score=3.0)]
+    fused = reciprocal_rank_fusion([vector, lexical])
+
+    assert [r["file"] for r in fused] == ["both.py", "a.py", "c.py", "b.py"]
+    assert fused[0]["fusion_score"] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 2))
+    assert fused[1]["fusion_score"] == pytest.approx(1 / (RRF_K + 1))
+
+
+def test_equal_ranks_are_broken_by_distance():
+    # A vector-only and a lexical-only hit at the same rank tie on fusion score
+    vector = [hit("vector_only.py", 0.7)]
+    lexical = [hit("lexical_only.py", 0.4, lexical_score=2.0)]
+    fused = reciprocal_rank_fusion([vector, lexical])
+
+    assert fused[0]["fusion_score"] == fused[1]["fusion_score"]
+    assert [r["file"] for r in fused] == ["lexical_only.py", "vector_only.py"]
+    assert [r["file"] for r in reciprocal_rank_fusion([lexical, vector])] == ["lexical_only.py", "vector_only.py"]
+
+
+def test_merged_hits_keep_fields_from_both_searches():
+    vector = [hit("both.py", 0.2, score=0.9)]
+    lexical = [hit("both.py", 0.2, lexical_score=3.0)]
+    merged = reciprocal_rank_fusion([vector, lexical])
+
+    assert len(merged) == 1
+    assert merged[0]["score"] == 0.9
+    assert merged[0]["lexical_score"] == 3.0
+
+
+def test_hybrid_retrieval_surfaces_lexical_only_hits(tmp_path, monkeypatch, make_chunks):
+    chunks = make_chunks(40, per_file=1)
+    chunks[25]["text"] = "def reciprocal_rank_fusion(result_lists, k=60):"
+    index = FaissIndex(index_path=str(tmp_path / "index.faiss"), index_type="flat")
+    index.add(chunks)
+    index.save()
+    # The question embeds next to chunk 0, nowhere near the function that names it
+    monkeypatch.setattr(retriever_module, "embed_query", lambda text, model_name=None: chunks[0]["vector"])
+    retriever = Retriever(faiss_index=index)
+
+    vector_only = retriever.retrieve("reciprocal_rank_fusion", top_k=3, hybrid=False, diversify=False, expand_tokens=0)
+    hybrid = retriever.retrieve("reciprocal_rank_fusion", top_k=3, hybrid=True, diversify=False, expand_tokens=0)
+
+    assert "f25.py" not in [r["file"] for r in vector_only]
+    assert "f25.py" in [r["file"] for r in hybrid]
+    assert hybrid[0]["file"] == vector_only[0]["file"] == "f0.py"
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from faiss_index import FaissIndex
+from safety_check import SafetyCheck
+
+
+@pytest.fixture
+def chunks(make_chunks):
+    return make_chunks(100, dim=8, per_file=1)
+
+
+@pytest.fixture
+def build_index(tmp_path, chunks):
+    def build(calibration_vectors=None, metric="l2"):
+        index = FaissIndex(index_path=str(tmp_path / "index.faiss"), index_type="flat", metric=metric)
+        index.add(chunks)
+        index.calibration_vectors = calibration_vectors
+        index.save()
+        return index
+
+    return build
+
+
+def test_threshold_defaults_without_calibration_questions(build_index):
+    index = build_index()
+    assert index.score_stats["threshold"] is None
+    assert SafetyCheck().distance_threshold(index.score_stats) == 1.6
+
+
+def test_threshold_is_calibrated_on_question_distances(build_index):
+    questions = np.random.default_rng(1).normal(size=(50, 8)).astype("float32")
+    index = build_index(calibration_vectors=questions, metric="cosine")
+
+    threshold = index.score_stats["threshold"]
+    assert threshold["distance"] == "query_top_k"
+    assert threshold["queries"] == 50
+    assert threshold["value"] == index.score_stats["query_top_k"][threshold["percentile"]]
+    assert SafetyCheck().distance_threshold(index.score_stats) == threshold["value"]
+
+    loaded = FaissIndex(index_path=index.index_path)
+    loaded.load()
+    assert loaded.score_stats["threshold"] == threshold
+
+
+def test_calibration_can_tighten_the_default(build_index, chunks):
+    # Questions close to indexed chunks give a calibration tighter than the default
+    questions = np.array([chunk["vector"] for chunk in chunks[:20]], dtype="float32") + 0.3 * np.random.default_rng(2).normal(size=(20, 8)).astype("float32")
+    index = build_index(calibration_vectors=questions, metric="cosine")
+    threshold = index.score_stats["threshold"]["value"]
+    assert 0.1 < threshold < 0.8
+    assert SafetyCheck().distance_threshold(index.score_stats) == threshold
+
+
+@pytest.mark.parametrize("metric,value,expected", [
+    ("l2", 0.0, 0.2),
+    ("l2", 9.0, 4.0),
+    ("l2", 1.1, 1.1),
+    ("cosine", 0.0, 0.1),
+    ("cosine", 3.0, 2.0),
+])
+def test_calibrated_threshold_is_clamped(metric, value, expected):
+    stats = {"metric": metric, "threshold": {"distance": "query_top_k", "percentile": "p95", "value": value}}
+    assert SafetyCheck().distance_threshold(stats) == pytest.approx(expected)
+
+
+def test_closely_related_chunks_are_allowed(tmp_path):
+    chunks = [{"file": f"f{i}.py", "chunk_id": 0, "text": "x" * 60, "distance": 1.2} for i in range(3)]
+    stats = {"metric": "l2", "threshold": {"distance": "query_top_k", "percentile": "p95", "value": 1.5}}
+    assert SafetyCheck().check({"intent": "explanation"}, chunks, score_stats=stats)["allowed"]
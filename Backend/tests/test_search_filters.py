@@ -0,0 +1,111 @@
+import pytest
+
+from chunk_store import ChunkStore, write_chunk_store
+from search_filters import chunk_matches, merge_filters, normalize_filters, parse_filter_query
+
+FILES = [
+    "backend/app.py",
+    "backend/app_test.py",
+    "backend/appXtest.py",
+    "backend/services/pdf_parser.py",
+    "backend/100%/report.py",
+    "backend/1000/report.py",
+    "backend/o'reilly/notes.md",
+    "backend/o_reilly/notes.md",
+    "backend/__init__.py",
+    "backend/xxinitxx.py",
+    "backend_old/app.py",
+    "frontend/README.md",
+    "frontend/src/index.ts",
+    "frontend/src/Main.TS",
+    "docs/50%.md",
+    "docs/50x.md",
+]
+
+FILTERS = [
+    {"path": ["backend"]},
+    {"path": ["backend/"]},
+    {"path": ["./backend/100%/"]},
+    {"path": ["backend/o'reilly"]},
+    {"path": ["backend/o_reilly"]},
+    {"path": ["frontend", "docs"]},
+    {"name": ["app_test"]},
+    {"name": ["__init__"]},
+    {"name": ["50%"]},
+    {"name": ["readme"]},
+    {"name": ["o'reilly"]},
+    {"lang": ["python"]},
+    {"lang": ["ts"], "path": ["frontend/src"]},
+    {"lang": ["%"]},
+    {"lang": ["_y"]},
+    {"type": ["function"], "path": ["backend"]},
+    {"symbol": ["parse'pdf"]},
+    {"symbol": ["parse_pdf", "main"]},
+]
+
+
+def chunk(i, file):
+    return {
+        "file": file,
+        "chunk_id": 0,
+        "text": f"t{i}",
+        "chunk_type": "function" if i % 2 else "class",
+        "symbol_name": "parse_pdf" if "pdf" in file else "parse'pdf" if "reilly" in file else "main",
+    }
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("store") / "index.faiss.chunks")
+    write_chunk_store(path, [(i, chunk(i, file)) for i, file in enumerate(FILES)])
+    return ChunkStore(path)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("extension_column", [True, False])
+def test_sql_filters_match_the_python_filters(store, filters, extension_column):
+    normalized = normalize_filters(filters)
+    expected = [i for i, file in enumerate(FILES) if chunk_matches(chunk(i, file), normalized)]
+    # Stores written before the extension column existed fall back to LIKE on the path
+    store._has_extension = extension_column
+    try:
+        assert store.ids_matching(normalized) == expected
+    finally:
+        store._has_extension = None
+
+
+def test_wildcard_and_quote_characters_are_literal(store):
+    def files(filters):
+        return [FILES[i] for i in store.ids_matching(normalize_filters(filters))]
+
+    assert files({"path": ["backend/100%"]}) == ["backend/100%/report.py"]
+    assert files({"path": ["backend/o_reilly"]}) == ["backend/o_reilly/notes.md"]
+    assert files({"path": ["backend/o'reilly"]}) == ["backend/o'reilly/notes.md"]
+    assert files({"name": ["app_"]}) == ["backend/app_test.py"]
+    assert files({"name": ["50%"]}) == ["docs/50%.md"]
+    assert files({"lang": ["%"]}) == []
+
+
+def test_normalize_filters_maps_fields_to_columns():
+    normalized = normalize_filters({"path": ["./backend\\services", "/docs"], "lang": ["Python", "ts"], "type": ["Function"], "name": ["README"]})
+    assert normalized == {
+        "path": ("backend/services", "docs"),
+        "name": ("readme",),
+        "extension": (".py", ".ts", ".tsx"),
+        "chunk_type": ("function",),
+    }
+    assert normalize_filters({}) is None
+    with pytest.raises(ValueError):
+        normalize_filters({"owner": ["me"]})
+
+
+def test_inline_and_request_filters_merge():
+    question, filters = parse_filter_query("how are pdfs parsed? path:backend/services lang:py,js")
+    assert question == "how are pdfs parsed?"
+    assert merge_filters(filters, {"lang": "ts", "name": ["parser"]}) == {
+        "path": ["backend/services"],
+        "lang": ["py", "js", "ts"],
+        "name": ["parser"],
+    }
+    with pytest.raises(ValueError):
+        merge_filters(filters, {"path": 3})
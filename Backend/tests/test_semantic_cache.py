@@ -0,0 +1,67 @@
+import numpy as np
+
+from semantic_cache import SemanticAnswerCache, chunk_set_key
+
+
+CHUNKS = [{"file": "app.py", "chunk_id": 1}, {"file": "rag/retriever.py", "chunk_id": 4}]
+KEY = chunk_set_key("how", CHUNKS)
+
+
+def _vector(seed, dim=16):
+    return np.random.default_rng(seed).standard_normal(dim).astype("float32")
+
+
+def _paraphrase(vector, noise=0.01):
+    return vector + noise * np.random.default_rng(99).standard_normal(vector.shape).astype("float32")
+
+
+def test_paraphrases_hit_and_unrelated_questions_miss():
+    cache = SemanticAnswerCache(threshold=0.95)
+    question = _vector(0)
+    cache.put("repo", "v1", question, KEY, "How does search work?", {"answer": "cached"})
+
+    hit = cache.get("repo", "v1", _paraphrase(question), KEY)
+    assert hit["body"] == {"answer": "cached"}
+    assert hit["similarity"] >= 0.95
+    assert cache.get("repo", "v1", _vector(1), KEY) is None
+
+
+def test_hits_require_the_same_chunk_set():
+    cache = SemanticAnswerCache(threshold=0.95)
+    question = _vector(0)
+    cache.put("repo", "v1", question, KEY, "How does search work?", {"answer": "cached"})
+
+    assert chunk_set_key("how", list(reversed(CHUNKS))) == KEY
+    assert cache.get("repo", "v1", question, chunk_set_key("how", CHUNKS[:1])) is None
+    assert cache.get("repo", "v1", question, chunk_set_key("where", CHUNKS)) is None
+
+
+def test_entries_are_scoped_to_the_index_version():
+    cache = SemanticAnswerCache()
+    question = _vector(0)
+    cache.put("repo", "v1", question, KEY, "q", {"answer": "v1"})
+    cache.put("other", "v1", question, KEY, "q", {"answer": "other"})
+
+    assert cache.get("repo", "v2", question, KEY) is None
+    cache.invalidate("repo", "v1")
+    assert cache.get("repo", "v1", question, KEY)["body"] == {"answer": "v1"}
+    cache.invalidate("repo", "v2")
+    assert cache.get("repo", "v1", question, KEY) is None
+    assert cache.get("other", "v1", question, KEY)["body"] == {"answer": "other"}
+
+    cache.put("repo", "v2", question, KEY, "q", {"answer": "v2"})
+    assert cache.get("repo", "v2", question, KEY)["body"] == {"answer": "v2"}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SemanticAnswerCache(max_size=2)
+    vectors = [_vector(seed) for seed in range(3)]
+    cache.put("repo", "v1", vectors[0], KEY, "q0", {"answer": 0})
+    cache.put("repo", "v1", vectors[1], KEY, "q1", {"answer": 1})
+    assert cache.get("repo", "v1", vectors[0], KEY) is not None
+    cache.put("repo", "v1", vectors[2], KEY, "q2", {"answer": 2})
+
+    assert cache.get("repo", "v1", vectors[1], KEY) is None
+    assert cache.get("repo", "v1", vectors[0], KEY)["body"] == {"answer": 0}
+    assert cache.get("repo", "v1", vectors[2], KEY)["body"] == {"answer": 2}
+    assert cache.stats()["size"] == 2
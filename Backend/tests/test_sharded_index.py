@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from faiss_index import FaissIndex
+from sharded_index import ShardedFaissIndex, load_index
+
+
+DIRS = ("backend", "frontend", "docs", "tools")
+
+
+def test_sharded_search_matches_a_single_flat_index(tmp_path, make_chunks):
+    chunks = make_chunks(400, dirs=DIRS)
+    flat = FaissIndex(index_path=str(tmp_path / "flat.faiss"), index_type="flat")
+    flat.add(chunks)
+    sharded = ShardedFaissIndex(num_shards=3, index_path=str(tmp_path / "sharded.faiss"), index_type="flat")
+    sharded.add(chunks)
+    sharded.save()
+
+    loaded = load_index(sharded.index_path)
+    queries = np.array([chunk["vector"] for chunk in chunks[:10]]) + 0.05
+    expected = [[r["text"] for r in rows] for rows in flat.search_batch(queries, 5)]
+    assert [[r["text"] for r in rows] for rows in loaded.search_batch(queries, 5)] == expected
+
+
+def test_score_stats_cover_every_shard(tmp_path, make_chunks):
+    sharded = ShardedFaissIndex(num_shards=4, index_path=str(tmp_path / "index.faiss"), index_type="flat")
+    sharded.add(make_chunks(400, dirs=DIRS))
+    sharded.save()
+    assert sharded.score_stats["sample_size"] == 400
+    assert load_index(sharded.index_path).score_stats == sharded.score_stats
+
+
+def test_sharding_refuses_dimension_reduction(tmp_path):
+    with pytest.raises(ValueError):
+        ShardedFaissIndex(num_shards=2, index_path=str(tmp_path / "index.faiss"), reduce_dim=8)
@@ -0,0 +1,33 @@
+from symbol_table import SymbolTable
+
+
+TABLE = SymbolTable({"config": [1], "load": [2], "SafetyCheck": [3], "get_repo_tree": [4], "chunk_repo": [5]})
+
+
+def test_identifier_shaped_words_resolve_exactly():
+    assert TABLE.resolve("where is get_repo_tree defined?") == (["get_repo_tree"], "exact")
+    assert TABLE.resolve("where is safetycheck... I mean SafetyCheck") == (["SafetyCheck"], "exact")
+
+
+def test_plain_english_words_do_not_resolve():
+    assert TABLE.resolve("where is the config loaded") == ([], None)
+    assert TABLE.resolve("where do we load files") == ([], None)
+
+
+def test_quoted_words_count_as_identifiers():
+    assert TABLE.resolve("where is `load` defined") == (["load"], "exact")
+    assert TABLE.resolve("where is `load()` defined") == (["load"], "exact")
+
+
+def test_typos_in_identifiers_resolve_fuzzily():
+    assert TABLE.resolve("where is chunk_repos") == (["chunk_repo"], "fuzzy")
+
+
+def test_capitalised_words_need_an_exact_case_match():
+    table = SymbolTable({"show": [1], "find_all": [2], "List": [3], "Config": [4]})
+    assert table.resolve("Show me how pages render") == ([], None)
+    assert table.resolve("Find where errors are logged") == ([], None)
+    assert table.resolve("Lists of users come from where?") == ([], None)
+    assert table.resolve("List is built where?") == (["List"], "exact")
+    assert table.resolve("Where is Config defined") == (["Config"], "exact")
+    assert table.resolve("where is `show` defined") == (["show"], "exact")
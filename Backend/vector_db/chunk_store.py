@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import threading
+
+try:
+    from .search_filters import file_extension, file_name_matches
+except ImportError:
+    from search_filters import file_extension, file_name_matches
+
+CHUNK_FIELDS = (
+    "file",
+    "chunk_id",
+    "text",
+    "chunk_type",
+    "symbol_name",
+    "start_line",
+    "end_line",
+    "code",
+)
+
+_SCHEMA = (
+    """
+    CREATE TABLE chunks (
+        id INTEGER PRIMARY KEY,
+        file TEXT NOT NULL,
+        chunk_id INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        chunk_type TEXT,
+        symbol_name TEXT,
+        start_line INTEGER,
+        end_line INTEGER,
+        code TEXT,
+        extension TEXT
+    )
+    """,
+    "CREATE INDEX chunks_file ON chunks (file, chunk_id)",
+    "CREATE INDEX chunks_extension ON chunks (extension)",
+    "CREATE INDEX chunks_chunk_type ON chunks (chunk_type)",
+    "CREATE INDEX chunks_symbol_name ON chunks (symbol_name)",
+    "CREATE TABLE tombstones (id INTEGER PRIMARY KEY)",
+)
+
+_SQLITE_MAX_VARIABLES = 900
+CHUNK_STORE_MMAP_SIZE = int(os.getenv("CHUNK_STORE_MMAP_SIZE", str(1 << 30)))
+
+
+def _like_escape(value):
+    # "%" and "_" in a file name are literal characters, not LIKE wildcards
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class ChunkStore:
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Chunk store not found: {path}")
+
+        self.path = path
+        self._has_extension = None
+        self._lock = threading.Lock()
+        # Stores are never modified after they are written, so one read-only connection is
+        # shared by every request thread and the OS page cache is used through SQLite's mmap I/O.
+        # It is opened here rather than on first use so the store stays readable even after
+        # its version directory is pruned.
+        self._conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size = {CHUNK_STORE_MMAP_SIZE}")
+
+    def _fetch(self, sql, params=()):
+        with self._lock:
+            if self._conn is None:
+                raise RuntimeError(f"Chunk store is closed: {self.path}")
+            return self._conn.execute(sql, params).fetchall()
+
+    def _select_in(self, columns, column, values):
+        values = list(values)
+        for start in range(0, len(values), _SQLITE_MAX_VARIABLES):
+            batch = values[start:start + _SQLITE_MAX_VARIABLES]
+            placeholders = ", ".join("?" for _ in batch)
+            yield from self._fetch(f"SELECT {columns} FROM chunks WHERE {column} IN ({placeholders})", batch)
+
+    def get_many(self, ids):
+        columns = ", ".join(("id",) + CHUNK_FIELDS)
+        return {
+            row[0]: dict(zip(CHUNK_FIELDS, row[1:]))
+            for row in self._select_in(columns, "id", (int(i) for i in ids))
+        }
+
+    def existing_ids(self, ids):
+        return {row[0] for row in self._select_in("id", "id", (int(i) for i in ids))}
+
+    def ids_for_files(self, files):
+        return [row[0] for row in self._select_in("id", "file", files)]
+
+    def file_range(self, file, first_chunk_id, last_chunk_id):
+        columns = ", ".join(("id",) + CHUNK_FIELDS)
+        rows = self._fetch(
+            f"SELECT {columns} FROM chunks WHERE file = ? AND chunk_id BETWEEN ? AND ? ORDER BY chunk_id",
+            (file, first_chunk_id, last_chunk_id),
+        )
+        return [(row[0], dict(zip(CHUNK_FIELDS, row[1:]))) for row in rows]
+
+    def enclosing(self, file, start_line, end_line):
+        columns = ", ".join(("id",) + CHUNK_FIELDS)
+        rows = self._fetch(
+            f"SELECT {columns} FROM chunks WHERE file = ? AND start_line <= ? AND end_line >= ? "
+            "ORDER BY end_line - start_line",
+            (file, start_line, end_line),
+        )
+        return [(row[0], dict(zip(CHUNK_FIELDS, row[1:]))) for row in rows]
+
+    def ids_matching(self, filters):
+        clauses = []
+        params = []
+
+        def any_of(parts, values):
+            clauses.append("(" + " OR ".join(parts) + ")")
+            params.extend(values)
+
+        if "path" in filters:
+            # Prefix ranges are answered from the (file, chunk_id) index
+            any_of(
+                ["(file >= ? AND file < ?)"] * len(filters["path"]),
+                [bound for prefix in filters["path"] for bound in (prefix, prefix + "\U0010ffff")],
+            )
+        if "extension" in filters:
+            if self._extension_column():
+                any_of(["extension = ?"] * len(filters["extension"]), filters["extension"])
+            else:
+                any_of(
+                    ["file LIKE ? ESCAPE '\\'"] * len(filters["extension"]),
+                    ["%" + _like_escape(ext) for ext in filters["extension"]],
+                )
+        for column in ("chunk_type", "symbol_name"):
+            if column in filters:
+                any_of([f"{column} = ?"] * len(filters[column]), filters[column])
+        if "name" in filters:
+            # LIKE narrows to paths containing the name; the basename check below is exact
+            any_of(
+                ["file LIKE ? ESCAPE '\\'"] * len(filters["name"]),
+                ["%" + _like_escape(name) + "%" for name in filters["name"]],
+            )
+
+        where = " AND ".join(clauses) or "1"
+        rows = self._fetch(f"SELECT id, file FROM chunks WHERE {where} ORDER BY id", params)
+        if "name" in filters:
+            return [uid for uid, file in rows if file_name_matches(file, filters["name"])]
+        return [uid for uid, _ in rows]
+
+    def _extension_column(self):
+        if self._has_extension is None:
+            columns = {row[1] for row in self._fetch("PRAGMA table_info(chunks)")}
+            self._has_extension = "extension" in columns
+        return self._has_extension
+
+    def all_ids(self):
+        return [row[0] for row in self._fetch("SELECT id FROM chunks ORDER BY id")]
+
+    def tombstones(self):
+        return {row[0] for row in self._fetch("SELECT id FROM tombstones")}
+
+    def iter_rows(self):
+        columns = ", ".join(("id",) + CHUNK_FIELDS)
+        last_id = -1
+        while True:
+            # Page by id so saving a large index never holds every row in memory at once
+            rows = self._fetch(
+                f"SELECT {columns} FROM chunks WHERE id > ? ORDER BY id LIMIT 1000",
+                (last_id,),
+            )
+            for row in rows:
+                yield row[0], dict(zip(CHUNK_FIELDS, row[1:]))
+            if len(rows) < 1000:
+                return
+            last_id = rows[-1][0]
+
+    def count(self):
+        return self._fetch("SELECT COUNT(*) FROM chunks")[0][0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def write_chunk_store(path, rows, tombstones=()):
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        conn.executemany(
+            f"INSERT INTO chunks (id, {', '.join(CHUNK_FIELDS)}, extension) VALUES ({', '.join('?' for _ in range(len(CHUNK_FIELDS) + 2))})",
+            (
+                (row_id,) + tuple(chunk.get(field) for field in CHUNK_FIELDS) + (file_extension(chunk["file"]),)
+                for row_id, chunk in rows
+            ),
+        )
+        conn.executemany("INSERT INTO tombstones (id) VALUES (?)", ((int(i),) for i in tombstones))
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
@@ -0,0 +1,244 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+try:
+    import re._constants as sre_constants
+    import re._parser as sre_parse
+except ImportError:
+    import sre_constants
+    import sre_parse
+
+CODE_SEARCH_MAX_RESULTS = int(os.getenv("CODE_SEARCH_MAX_RESULTS", "200"))
+CODE_SEARCH_MAX_FILE_BYTES = int(os.getenv("CODE_SEARCH_MAX_FILE_BYTES", str(2 << 20)))
+# Python regexes cannot be interrupted, so user patterns are bounded by size and by how many
+# files one query may run them over
+CODE_SEARCH_MAX_PATTERN = int(os.getenv("CODE_SEARCH_MAX_PATTERN", "256"))
+CODE_SEARCH_MAX_SCAN = int(os.getenv("CODE_SEARCH_MAX_SCAN", "5000"))
+_FETCH_BATCH = 256
+
+
+class CodeIndexMissingError(LookupError):
+    pass
+
+
+def _trigrams(text):
+    data = np.frombuffer(text.lower().encode("utf-8"), dtype="uint8").astype("uint32")
+    if len(data) < 3:
+        return np.array([], dtype="uint32")
+    return np.unique((data[:-2] << 16) | (data[1:-1] << 8) | data[2:])
+
+
+def _literal_plan(nodes):
+    # Returns (required literals, [alternative groups]); every literal must occur in
+    # a matching file, and for each group at least one branch must.
+    literals = []
+    groups = []
+    current = []
+
+    def flush():
+        if current:
+            literals.append("".join(current))
+            current.clear()
+
+    for op, av in nodes:
+        if op == sre_constants.LITERAL:
+            current.append(chr(av))
+            continue
+        flush()
+        if op == sre_constants.SUBPATTERN:
+            sub_literals, sub_groups = _literal_plan(av[-1])
+            literals.extend(sub_literals)
+            groups.extend(sub_groups)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            sub_literals, sub_groups = _literal_plan(av[2])
+            literals.extend(sub_literals)
+            groups.extend(sub_groups)
+        elif op == sre_constants.BRANCH:
+            groups.append([_literal_plan(branch) for branch in av[1]])
+    flush()
+    return literals, groups
+
+
+class CodeSearchIndex:
+    def __init__(self, path, trigrams, offsets, postings, file_count):
+        self.path = path
+        self.trigrams = trigrams
+        self.offsets = offsets
+        self.postings = postings
+        self.file_count = file_count
+        self._lock = threading.Lock()
+        # One read-only connection for every request thread, opened now so the store stays
+        # readable after its version directory is pruned
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+
+    @classmethod
+    def build(cls, index_path, repo_dir, files):
+        db_path = index_path + ".code"
+        tmp_path = db_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        grams = []
+        owners = []
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT NOT NULL, content TEXT NOT NULL)")
+            file_id = 0
+            for path in sorted(set(files)):
+                full_path = os.path.join(repo_dir, path)
+                try:
+                    if os.path.getsize(full_path) > CODE_SEARCH_MAX_FILE_BYTES:
+                        continue
+                    with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                        content = f.read()
+                except OSError as e:
+                    print(f"Skipping {full_path}: {e}")
+                    continue
+
+                conn.execute("INSERT INTO files (id, path, content) VALUES (?, ?, ?)", (file_id, path, content))
+                file_grams = _trigrams(content)
+                grams.append(file_grams)
+                owners.append(np.full(len(file_grams), file_id, dtype="int32"))
+                file_id += 1
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+
+        # Flat postings sorted by trigram; a trigram's files are postings[offsets[i]:offsets[i + 1]]
+        grams = np.concatenate(grams) if grams else np.array([], dtype="uint32")
+        owners = np.concatenate(owners) if owners else np.array([], dtype="int32")
+        order = np.lexsort((owners, grams))
+        grams, postings = grams[order], owners[order]
+        trigrams, starts = np.unique(grams, return_index=True)
+        offsets = np.append(starts, len(grams)).astype("int64")
+
+        trigram_path = index_path + ".trigrams"
+        with open(trigram_path + ".tmp", "wb") as f:
+            np.savez(f, trigrams=trigrams, offsets=offsets, postings=postings, file_count=np.array([file_id]))
+        os.replace(trigram_path + ".tmp", trigram_path)
+
+        print(f"Built trigram code index over {file_id} files ({len(trigrams)} trigrams)")
+        return cls(db_path, trigrams, offsets, postings, file_id)
+
+    @classmethod
+    def load(cls, index_path):
+        with np.load(index_path + ".trigrams") as data:
+            return cls(
+                index_path + ".code",
+                data["trigrams"],
+                data["offsets"],
+                data["postings"],
+                int(data["file_count"][0]),
+            )
+
+    @staticmethod
+    def exists(index_path):
+        return os.path.exists(index_path + ".trigrams") and os.path.exists(index_path + ".code")
+
+    def _fetch(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _posting(self, trigram):
+        i = int(np.searchsorted(self.trigrams, trigram))
+        if i >= len(self.trigrams) or self.trigrams[i] != trigram:
+            return np.array([], dtype="int32")
+        return self.postings[self.offsets[i]:self.offsets[i + 1]]
+
+    def _candidates(self, plan):
+        literals, groups = plan
+        lists = [self._posting(trigram) for literal in literals if len(literal) >= 3 for trigram in _trigrams(literal)]
+        candidates = None
+        for posting in sorted(lists, key=len):
+            candidates = posting if candidates is None else np.intersect1d(candidates, posting, assume_unique=True)
+            if len(candidates) == 0:
+                return candidates
+
+        for branches in groups:
+            branch_sets = [self._candidates(branch) for branch in branches]
+            if any(branch is None for branch in branch_sets):
+                continue
+            union = np.unique(np.concatenate(branch_sets)) if branch_sets else np.array([], dtype="int32")
+            candidates = union if candidates is None else np.intersect1d(candidates, union, assume_unique=True)
+        return candidates
+
+    def search(
+        self,
+        query,
+        regex=False,
+        case_sensitive=False,
+        path=None,
+        max_results=CODE_SEARCH_MAX_RESULTS,
+        max_scan=CODE_SEARCH_MAX_SCAN,
+    ):
+        if not query:
+            raise ValueError("query is required")
+        if len(query) > CODE_SEARCH_MAX_PATTERN:
+            raise ValueError(f"query is longer than {CODE_SEARCH_MAX_PATTERN} characters")
+
+        started = time.perf_counter()
+        flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+        source = query if regex else re.escape(query)
+        try:
+            pattern = re.compile(source, flags)
+        except re.error as exc:
+            raise ValueError(f"Invalid regex: {exc}")
+
+        plan = ([query], []) if not regex else _literal_plan(sre_parse.parse(source, flags))
+        candidates = self._candidates(plan)
+        indexed = candidates is not None
+        if candidates is None:
+            # Nothing of 3+ literal characters to narrow on: scan every file
+            candidates = np.arange(self.file_count, dtype="int32")
+
+        path_prefix = path.replace("\\", "/").lstrip("/") if path else None
+        if path_prefix is None and len(candidates) > max_scan:
+            raise ValueError(
+                f"query would scan {len(candidates)} files (limit {max_scan}); "
+                "narrow it with a path or a longer literal string"
+            )
+        matches = []
+        scanned = 0
+        truncated = False
+        ids = candidates.tolist()
+        for start in range(0, len(ids), _FETCH_BATCH):
+            batch = ids[start:start + _FETCH_BATCH]
+            placeholders = ", ".join("?" for _ in batch)
+            rows = self._fetch(f"SELECT path, content FROM files WHERE id IN ({placeholders}) ORDER BY path", batch)
+            for file_path, content in rows:
+                if path_prefix and not file_path.replace("\\", "/").startswith(path_prefix):
+                    continue
+                scanned += 1
+                if scanned > max_scan:
+                    raise ValueError(
+                        f"query would scan more than {max_scan} files; "
+                        "narrow it with a path or a longer literal string"
+                    )
+                if not pattern.search(content):
+                    continue
+                for line_number, line in enumerate(content.splitlines(), start=1):
+                    if pattern.search(line):
+                        matches.append({"file": file_path, "line": line_number, "text": line.rstrip()[:500]})
+                        if len(matches) >= max_results:
+                            truncated = True
+                            break
+                if truncated:
+                    break
+            if truncated:
+                break
+
+        return {
+            "matches": matches,
+            "truncated": truncated,
+            "candidates": len(ids),
+            "files_scanned": scanned,
+            "files_total": self.file_count,
+            "indexed": indexed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
@@ -1,12 +1,149 @@
-import faiss
+import hashlib
+import json
 import numpy as np
 import pickle
 import os
 import sys
 
+try:
+    from .chunk_store import ChunkStore, write_chunk_store
+    from .lexical_index import LexicalIndex, identifier_tokens
+    from .index_factory import (
+        INDEX_TYPES,
+        METRICS,
+        create_index,
+        mmap_flags,
+        resolve_build_params,
+        search_parameters,
+        training_sample,
+        with_stable_ids,
+    )
+    from .reduction import REDUCTION_METHODS, build_reducer
+    from .search_filters import chunk_matches, normalize_filters
+    from .symbol_table import SymbolTable
+except ImportError:
+    from chunk_store import ChunkStore, write_chunk_store
+    from lexical_index import LexicalIndex, identifier_tokens
+    from index_factory import (
+        INDEX_TYPES,
+        METRICS,
+        create_index,
+        mmap_flags,
+        resolve_build_params,
+        search_parameters,
+        training_sample,
+        with_stable_ids,
+    )
+    from reduction import REDUCTION_METHODS, build_reducer
+    from search_filters import chunk_matches, normalize_filters
+    from symbol_table import SymbolTable
+
+METADATA_FORMAT_VERSION = 3
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"
+COMPACT_TOMBSTONE_RATIO = float(os.getenv("COMPACT_TOMBSTONE_RATIO", "0.2"))
+SCORE_STATS_SAMPLE = 1000
+SCORE_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+CALIBRATION_QUERIES = int(os.getenv("CALIBRATION_QUERIES", "200"))
+CALIBRATION_TOP_K = 5
+RELEVANCE_PERCENTILE = os.getenv("RELEVANCE_PERCENTILE", "p95")
+FILTER_EXACT_MAX_IDS = int(os.getenv("FILTER_EXACT_MAX_IDS", "2048"))
+
+
+def chunk_uid(file, chunk_id):
+    digest = hashlib.blake2b(f"{file}:{chunk_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFFFFFFFFFFFFFF
+
+
+def calibration_questions(chunks, limit=CALIBRATION_QUERIES):
+    # Stand-in questions for calibrating relevance thresholds: the real ones are not known at index time
+    rng = np.random.default_rng(0)
+    sample = rng.permutation(len(chunks))[:limit]
+    questions = []
+    for i in sample.tolist():
+        chunk = chunks[i]
+        tokens = identifier_tokens(chunk.get("symbol_name"))
+        if tokens:
+            # "get_repo_tree" reads as "get repo tree", the way people ask about it
+            questions.append(f"Where is {' '.join(tokens[1:] or tokens)} implemented?")
+        else:
+            questions.append(f"What does {os.path.basename(chunk['file'])} do?")
+    return questions
+
+
+def _chunk_metadata(chunk):
+    return {
+        "file": chunk["file"],
+        "chunk_id": chunk["chunk_id"],
+        "text": chunk["text"],
+        "chunk_type": chunk.get("chunk_type"),
+        "symbol_name": chunk.get("symbol_name"),
+        "start_line": chunk.get("start_line"),
+        "end_line": chunk.get("end_line"),
+        "code": chunk.get("code"),
+    }
+
+
+def compute_score_stats(faiss_index, sample_size=SCORE_STATS_SAMPLE, top_k=10):
+    # Distance percentiles for any index exposing live_ids/reconstruct/_search_ids (single or sharded)
+    live_ids = faiss_index.live_ids()
+    if len(live_ids) < 3:
+        return None
+
+    rng = np.random.default_rng(0)
+    sample_ids = rng.choice(live_ids, size=min(sample_size, len(live_ids)), replace=False)
+    vectors = faiss_index._prepare_vectors(faiss_index.reconstruct(sample_ids))
+
+    neighbors = []
+    for query_id, results in zip(sample_ids.tolist(), faiss_index._search_ids(vectors, min(top_k + 1, len(live_ids)))):
+        neighbors.append([distance for uid, distance in results if uid != query_id])
+    nearest = [row[0] for row in neighbors if row]
+    top_k_distances = [d for row in neighbors for d in row]
+
+    partners = rng.permutation(len(vectors))
+    random_pairs = faiss_index._distances(vectors, vectors[partners])[partners != np.arange(len(vectors))]
+
+    def percentiles(values):
+        values = np.asarray(values, dtype="float64")
+        return {f"p{p}": round(float(np.percentile(values, p)), 6) for p in SCORE_PERCENTILES}
+
+    stats = {
+        "metric": faiss_index.metric,
+        "sample_size": int(len(sample_ids)),
+        "nearest_neighbor": percentiles(nearest),
+        "top_k": percentiles(top_k_distances),
+        "random_pair": percentiles(random_pairs),
+        "threshold": None,
+    }
+
+    if faiss_index.calibration_vectors is not None and len(faiss_index.calibration_vectors):
+        # SafetyCheck compares a question's mean distance to its retrieved chunks, so the
+        # threshold is calibrated on that same quantity for the calibration questions
+        queries = faiss_index._prepare_vectors(np.asarray(faiss_index.calibration_vectors, dtype="float32").reshape(-1, faiss_index.vector_dim))
+        rows = faiss_index._search_ids(queries, min(CALIBRATION_TOP_K, len(live_ids)))
+        query_means = [float(np.mean([distance for _, distance in row])) for row in rows if row]
+        if query_means:
+            stats["query_top_k"] = percentiles(query_means)
+            stats["threshold"] = {
+                "distance": "query_top_k",
+                "percentile": RELEVANCE_PERCENTILE,
+                "queries": len(query_means),
+                "value": stats["query_top_k"][RELEVANCE_PERCENTILE],
+            }
+    return stats
+
 
 class FaissIndex:
-    def __init__(self, vector_dim=None, index_path=None):
+    def __init__(
+        self,
+        vector_dim=None,
+        index_path=None,
+        model_info=None,
+        reduce_dim=None,
+        reduction="pca",
+        index_type="auto",
+        build_params=None,
+        metric="l2",
+    ):
         if index_path is None:
             backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             index_dir = os.path.join(backend_dir, "data", "vector_store")
@@ -15,102 +152,542 @@ class FaissIndex:
         
         self.index_path = index_path
         self.vector_dim = vector_dim
+        self.model_info = model_info
+        self.reduction = {"method": reduction, "dim": reduce_dim} if reduce_dim else None
+        self.index_type = index_type
+        self.build_params = build_params
+        self.metric = metric
+        self.score_stats = None
+        self.profile = None
+        self.calibration_vectors = None
         self.index = None
-        self.metadata = []
+        self.mmapped = False
+        self.store = None
+        self.lexical = None
+        self.symbols = None
+        self.pending = {}
+        self.removed = set()
+        self.tombstones = set()
         
-        if vector_dim is not None:
-            self.index = faiss.IndexFlatL2(vector_dim)
+        if vector_dim is not None and self.reduction is None and index_type == "flat":
+            self.index = with_stable_ids(create_index("flat", vector_dim, {}, metric=metric))
+
+    @property
+    def ntotal(self):
+        return 0 if self.index is None else int(self.index.ntotal) - len(self.tombstones)
 
     def add(self, embedded_chunks):
         if not embedded_chunks:
             raise ValueError("embedded_chunks cannot be empty")
+
+        self._check_writable()
         
-        if self.index is None:
-            first_vector = embedded_chunks[0]["vector"]
-            self.vector_dim = len(first_vector)
-            self.index = faiss.IndexFlatL2(self.vector_dim)
-            print(f"Initialized FAISS index with dimension: {self.vector_dim}")
+        if self.vector_dim is None:
+            self.vector_dim = len(embedded_chunks[0]["vector"])
+            if self.model_info and self.model_info["dimension"] != self.vector_dim:
+                raise ValueError(
+                    f"Model {self.model_info['name']} produces {self.model_info['dimension']}-d vectors, "
+                    f"got {self.vector_dim}"
+                )
         
+        ids = [chunk_uid(chunk["file"], chunk["chunk_id"]) for chunk in embedded_chunks]
+        if len(set(ids)) != len(ids):
+            raise ValueError("embedded_chunks contains duplicate (file, chunk_id) pairs")
+
+        duplicates = self._live_ids(ids)
+        if duplicates:
+            raise ValueError(f"{len(duplicates)} chunk(s) are already indexed. Use upsert_chunks to replace them.")
+
         vectors = []
         for chunk in embedded_chunks:
             vector = chunk["vector"]
             if len(vector) != self.vector_dim:
                 raise ValueError(f"Vector dimension mismatch: expected {self.vector_dim}, got {len(vector)}")
-            
             vectors.append(vector)
-            self.metadata.append({
-                "file": chunk["file"],
-                "chunk_id": chunk["chunk_id"],
-                "text": chunk["text"],
-                "chunk_type": chunk.get("chunk_type"),
-                "symbol_name": chunk.get("symbol_name"),
-                "start_line": chunk.get("start_line"),
-                "end_line": chunk.get("end_line"),
-                "code": chunk.get("code"),
-            })
-
-        vectors = np.array(vectors).astype("float32")
-        self.index.add(vectors)
+
+        vectors = self._prepare_vectors(vectors)
+        if self.index is None:
+            self.index = self._create_index(vectors)
+        self.index.add_with_ids(vectors, np.array(ids, dtype="int64"))
+
+        for uid, chunk in zip(ids, embedded_chunks):
+            self.pending[uid] = _chunk_metadata(chunk)
+            self.removed.discard(uid)
         print(f"Added {len(vectors)} vectors to FAISS index (total: {self.index.ntotal})")
 
-    def search(self, query_vector, top_k=5):
+    def remove_ids(self, ids):
+        import faiss
+
+        self._check_writable()
+        ids = self._live_ids(ids)
+        if not ids:
+            return 0
+
+        id_array = np.array(sorted(ids), dtype="int64")
+        try:
+            self.index.remove_ids(faiss.IDSelectorArray(id_array))
+        except RuntimeError:
+            self._tombstone(id_array)
+
+        for uid in ids:
+            if self.pending.pop(uid, None) is None:
+                self.removed.add(uid)
+        return len(ids)
+
+    def remove_by_file(self, file):
+        return self.remove_files([file])
+
+    def remove_files(self, files):
+        files = set(files)
+        ids = [uid for uid, chunk in self.pending.items() if chunk["file"] in files]
+        if self.store:
+            ids.extend(self.store.ids_for_files(files))
+        return self.remove_ids(ids)
+
+    def upsert_chunks(self, embedded_chunks):
+        if not embedded_chunks:
+            raise ValueError("embedded_chunks cannot be empty")
+
+        removed = self.remove_files({chunk["file"] for chunk in embedded_chunks})
+        self.add(embedded_chunks)
+        return {"removed": removed, "added": len(embedded_chunks)}
+
+    def compact(self, force=False):
+        if not self.tombstones:
+            return False
+
+        self._check_writable()
+
+        live_count = self.index.ntotal - len(self.tombstones)
+        if not force and len(self.tombstones) < COMPACT_TOMBSTONE_RATIO * self.index.ntotal:
+            return False
+
+        import faiss
+
+        all_ids = faiss.vector_to_array(self.index.id_map)
+        live_ids = all_ids[~np.isin(all_ids, np.fromiter(self.tombstones, dtype="int64"))]
+        print(f"Compacting FAISS index: dropping {len(self.tombstones)} deleted vectors, keeping {live_count}")
+
+        vectors = self.index.reconstruct_batch(live_ids)
+        self.index = self._create_index(vectors)
+        self.index.add_with_ids(vectors, live_ids)
+        self.tombstones = set()
+        return True
+
+    def live_ids(self):
+        ids = [uid for uid in self.store.all_ids() if uid not in self.removed and uid not in self.pending] if self.store else []
+        ids.extend(self.pending)
+        return np.array(ids, dtype="int64")
+
+    def reconstruct(self, ids):
+        return self.index.reconstruct_batch(np.asarray(ids, dtype="int64"))
+
+    def _tombstone(self, id_array):
+        import faiss
+
+        # HNSW graphs cannot delete nodes. Re-label the vectors with negative
+        # sentinel ids so the chunk ids can be reused right away, exclude the
+        # sentinels at search time, and drop them for good in compact().
+        id_map = faiss.vector_to_array(self.index.id_map)
+        positions = np.nonzero(np.isin(id_map, id_array))[0]
+        sentinels = -2 - positions
+        id_map[positions] = sentinels
+        faiss.copy_array_to_vector(id_map, self.index.id_map)
+        self.index.construct_rev_map()
+        self.tombstones.update(sentinels.tolist())
+
+    def _check_writable(self):
+        if self.mmapped:
+            raise ValueError("Index was loaded memory-mapped and is read-only. Use load(mmap=False) to modify it.")
+
+    def _live_ids(self, ids):
+        ids = {int(i) for i in ids}
+        live = {uid for uid in ids if uid in self.pending}
+        if self.store:
+            live.update(self.store.existing_ids(ids - live - self.removed))
+        return live
+
+    def _create_index(self, training_vectors):
+        import faiss
+
+        stored_dim = self.reduction["dim"] if self.reduction else self.vector_dim
+        self.index_type, self.build_params = resolve_build_params(
+            self.index_type,
+            stored_dim,
+            len(training_vectors),
+            self.build_params,
+        )
+        index = create_index(self.index_type, stored_dim, self.build_params, metric=self.metric)
+
+        if self.reduction:
+            transform = build_reducer(
+                self.reduction["method"],
+                self.vector_dim,
+                self.reduction["dim"],
+                training_vectors,
+            )
+            if self.metric == "cosine":
+                index = faiss.IndexPreTransform(faiss.NormalizationTransform(stored_dim), index)
+                index.prepend_transform(transform)
+            else:
+                index = faiss.IndexPreTransform(transform, index)
+
+        if not index.is_trained:
+            sample = training_sample(training_vectors)
+            print(f"Training {self.index_type} index on {len(sample)} vectors...")
+            index.train(sample)
+
+        print(f"Initialized {self.index_type} FAISS index with dimension: {self.vector_dim}")
+        if self.reduction:
+            print(f"Vectors reduced to {self.reduction['dim']} dimensions ({self.reduction['method']})")
+        return with_stable_ids(index)
+
+    def search(self, query_vector, top_k=5, nprobe=None, ef_search=None, filters=None):
+        return self.search_batch([query_vector], top_k=top_k, nprobe=nprobe, ef_search=ef_search, filters=filters)[0]
+
+    def search_batch(self, query_vectors, top_k=5, nprobe=None, ef_search=None, filters=None):
         if self.index is None or self.index.ntotal == 0:
             raise ValueError("Index is empty. Add vectors before searching.")
         
-        query_vector = np.array([query_vector]).astype("float32")
-        distances, indices = self.index.search(query_vector, top_k)
+        query_vectors = self._prepare_vectors(np.asarray(query_vectors, dtype="float32").reshape(-1, self.vector_dim))
 
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx >= 0 and idx < len(self.metadata):
-                result = self.metadata[idx].copy()
-                result["distance"] = float(distances[0][i])
-                results.append(result)
+        filters = normalize_filters(filters)
+        if filters:
+            allowed = self.filter_ids(filters)
+            if len(allowed) == 0:
+                return [[] for _ in range(len(query_vectors))]
+            if len(allowed) <= FILTER_EXACT_MAX_IDS and self.reduction is None:
+                distances, indices = self._exact_search(query_vectors, allowed, top_k)
+            else:
+                import faiss
+
+                # Live ids only, so tombstoned sentinels are excluded as well
+                params = search_parameters(self.index, nprobe=nprobe, ef_search=ef_search, sel=faiss.IDSelectorBatch(allowed))
+                distances, indices = self.index.search(query_vectors, top_k, params=params)
+        else:
+            params = search_parameters(self.index, nprobe=nprobe, ef_search=ef_search, sel=self._tombstone_selector())
+            distances, indices = self.index.search(query_vectors, top_k, params=params)
+
+        found = self._fetch_metadata(np.unique(indices[indices >= 0]).tolist())
+
+        batch_results = []
+        for row_distances, row_indices in zip(distances.tolist(), indices.tolist()):
+            results = []
+            for distance, idx in zip(row_distances, row_indices):
+                if idx in found:
+                    result = found[idx].copy()
+                    if self.metric == "cosine":
+                        result["score"] = distance
+                        distance = 1.0 - distance
+                    result["distance"] = distance
+                    results.append(result)
+            batch_results.append(results)
+
+        return batch_results
+
+    def lexical_search(self, question, query_vector, top_k=5, filters=None):
+        if self.lexical is None:
+            return []
+
+        filters = normalize_filters(filters)
+        allowed = self.filter_ids(filters) if filters else None
+        hits = [(uid, score) for uid, score in self.lexical.search(question, top_k, allowed=allowed) if uid not in self.removed]
+        found = self._fetch_metadata([uid for uid, _ in hits])
+        hits = [(uid, score) for uid, score in hits if uid in found]
+        if not hits:
+            return []
 
+        # Lexical hits may not be vector neighbours at all; give them real distances
+        # so relevance thresholds downstream treat both kinds of hits the same way.
+        vectors = self._prepare_vectors(self.reconstruct([uid for uid, _ in hits]))
+        query = self._prepare_vectors(np.asarray(query_vector, dtype="float32").reshape(1, -1))
+        distances = self._distances(np.repeat(query, len(hits), axis=0), vectors).tolist()
+
+        results = []
+        for (uid, score), distance in zip(hits, distances):
+            result = found[uid].copy()
+            if self.metric == "cosine":
+                result["score"] = 1.0 - distance
+            result["distance"] = distance
+            result["lexical_score"] = score
+            results.append(result)
         return results
 
+    def symbol_search(self, question, top_k=5, filters=None):
+        if self.symbols is None:
+            return []
+
+        names, match = self.symbols.resolve(question)
+        definitions = self._symbol_definitions(names)
+        filters = normalize_filters(filters)
+        if filters:
+            definitions = [chunk for chunk in definitions if chunk_matches(chunk, filters)]
+
+        # Found by name rather than by similarity, so they rank as perfect matches
+        return [dict(chunk, distance=0.0, symbol_match=match) for chunk in definitions[:top_k]]
+
+    def find_symbols(self, query, mode="exact", limit=20):
+        if self.symbols is None:
+            return []
+        return [
+            {field: chunk.get(field) for field in ("symbol_name", "file", "chunk_type", "start_line", "end_line")}
+            for chunk in self._symbol_definitions(self.symbols.find(query, mode=mode, limit=limit))
+        ]
+
+    def _symbol_definitions(self, names):
+        uids = [uid for name in names for uid in self.symbols.definitions[name] if uid not in self.removed]
+        found = self._fetch_metadata(uids)
+        return [found[uid] for uid in uids if uid in found]
+
+    def neighbor_chunks(self, file, chunk_id, radius=1):
+        rows = self._saved_rows(self.store.file_range(file, chunk_id - radius, chunk_id + radius) if self.store else [])
+        rows.extend(
+            chunk for chunk in self.pending.values()
+            if chunk["file"] == file and abs(chunk["chunk_id"] - chunk_id) <= radius
+        )
+        return sorted(rows, key=lambda chunk: chunk["chunk_id"])
+
+    def enclosing_chunk(self, file, chunk_id, start_line, end_line):
+        if start_line is None or end_line is None:
+            return None
+
+        rows = self._saved_rows(self.store.enclosing(file, start_line, end_line) if self.store else [])
+        rows.extend(
+            chunk for chunk in self.pending.values()
+            if chunk["file"] == file
+            and chunk.get("start_line") is not None
+            and chunk["start_line"] <= start_line
+            and chunk["end_line"] >= end_line
+        )
+        spans = [chunk for chunk in rows if chunk["chunk_id"] != chunk_id]
+        return min(spans, key=lambda chunk: chunk["end_line"] - chunk["start_line"]) if spans else None
+
+    def _saved_rows(self, rows):
+        return [chunk for uid, chunk in rows if uid not in self.removed and uid not in self.pending]
+
+    def filter_ids(self, filters):
+        ids = [uid for uid in self.store.ids_matching(filters) if uid not in self.removed and uid not in self.pending] if self.store else []
+        ids.extend(uid for uid, chunk in self.pending.items() if chunk_matches(chunk, filters))
+        return np.array(ids, dtype="int64")
+
+    def _exact_search(self, query_vectors, ids, top_k):
+        # A handful of matching chunks: scoring them directly is cheaper than a
+        # graph/IVF walk that has to skip almost every candidate, and never misses.
+        vectors = self._prepare_vectors(self.reconstruct(ids))
+        if self.metric == "cosine":
+            scores = query_vectors @ vectors.T
+            order = np.argsort(-scores, axis=1)[:, :top_k]
+        else:
+            scores = (
+                (query_vectors ** 2).sum(axis=1)[:, None]
+                - 2 * query_vectors @ vectors.T
+                + (vectors ** 2).sum(axis=1)[None, :]
+            )
+            order = np.argsort(scores, axis=1)[:, :top_k]
+        return np.take_along_axis(scores, order, axis=1), ids[order]
+
+    def _prepare_vectors(self, vectors):
+        import faiss
+
+        vectors = np.array(vectors, dtype="float32", order="C")
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        return vectors
+
+    def _distances(self, a, b):
+        if self.metric == "cosine":
+            return 1.0 - np.einsum("ij,ij->i", a, b)
+        return np.einsum("ij,ij->i", a - b, a - b)
+
+    def compute_score_stats(self, sample_size=SCORE_STATS_SAMPLE, top_k=10):
+        return compute_score_stats(self, sample_size=sample_size, top_k=top_k)
+
+    def _tombstone_selector(self):
+        import faiss
+
+        if not self.tombstones:
+            return None
+        return faiss.IDSelectorNot(faiss.IDSelectorBatch(np.fromiter(self.tombstones, dtype="int64")))
+
+    def _search_ids(self, vectors, top_k):
+        params = search_parameters(self.index, sel=self._tombstone_selector())
+        distances, indices = self.index.search(vectors, top_k, params=params)
+        if self.metric == "cosine":
+            distances = 1.0 - distances
+        return [
+            [(uid, distance) for uid, distance in zip(row_indices, row_distances) if uid >= 0]
+            for row_indices, row_distances in zip(indices.tolist(), distances.tolist())
+        ]
+
+    def _fetch_metadata(self, ids):
+        found = {uid: self.pending[uid] for uid in ids if uid in self.pending}
+        if self.store:
+            found.update(self.store.get_many(uid for uid in ids if uid not in found and uid not in self.removed))
+        return found
+
+    def _iter_rows(self):
+        if self.store:
+            for uid, chunk in self.store.iter_rows():
+                if uid not in self.removed and uid not in self.pending:
+                    yield uid, chunk
+        yield from self.pending.items()
+
     def save(self):
         if self.index is None or self.index.ntotal == 0:
             raise ValueError("Cannot save empty index")
         
+        import faiss
+
+        self.compact()
+        self.score_stats = self.compute_score_stats()
+
         os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
-        faiss.write_index(self.index, self.index_path)
+        # Readers may have the old file memory-mapped; overwriting it in place crashes them with SIGBUS
+        faiss.write_index(self.index, self.index_path + ".tmp")
+        _replace_synced(self.index_path + ".tmp", self.index_path)
+        write_chunk_store(self.index_path + ".chunks", self._iter_rows(), self.tombstones)
+        self.lexical = LexicalIndex.build(self._iter_rows())
+        self.lexical.save(self.index_path + ".lexical")
+        self.symbols = SymbolTable.build(self._iter_rows())
+        self.symbols.save(self.index_path + ".symbols")
         
-        with open(self.index_path + ".meta", "wb") as f:
-            pickle.dump({
-                "metadata": self.metadata,
-                "vector_dim": self.vector_dim
-            }, f)
+        write_meta(self.index_path + ".meta", {
+            "format_version": METADATA_FORMAT_VERSION,
+            "count": int(self.index.ntotal) - len(self.tombstones),
+            "vector_dim": self.vector_dim,
+            "model_info": self.model_info,
+            "reduction": self.reduction,
+            "index_type": self.index_type,
+            "build_params": self.build_params,
+            "metric": self.metric,
+            "score_stats": self.score_stats,
+            "profile": self.profile,
+        })
+
+        self.store = ChunkStore(self.index_path + ".chunks")
+        self.pending = {}
+        self.removed = set()
         
         print(f"Saved FAISS index to: {self.index_path}")
-        print(f"Total vectors: {self.index.ntotal}")
+        print(f"Total vectors: {self.index.ntotal - len(self.tombstones)}")
 
-    def load(self):
+    def load(self, mmap=None):
         if not os.path.exists(self.index_path):
             raise FileNotFoundError(f"Index file not found: {self.index_path}")
         
         if not os.path.exists(self.index_path + ".meta"):
             raise FileNotFoundError(f"Metadata file not found: {self.index_path}.meta")
         
-        self.index = faiss.read_index(self.index_path)
-        
         with open(self.index_path + ".meta", "rb") as f:
-            data = pickle.load(f)
-            self.metadata = data["metadata"]
-            self.vector_dim = data["vector_dim"]
+            header = f.read()
+        if header.startswith(b"\x80") or json.loads(header).get("format_version", 0) < METADATA_FORMAT_VERSION:
+            raise ValueError(
+                f"{self.index_path} uses an older index format. "
+                f"Convert it with: python vector_db/faiss_index.py --migrate {self.index_path}"
+            )
+        data = json.loads(header)
+
+        self.vector_dim = data["vector_dim"]
+        self.model_info = data.get("model_info")
+        self.reduction = data.get("reduction")
+        self.index_type = data.get("index_type", "flat")
+        self.build_params = data.get("build_params", {})
+        self.metric = data.get("metric", "l2")
+        self.score_stats = data.get("score_stats")
+        self.profile = data.get("profile")
+        self.index = self._read_index(INDEX_MMAP if mmap is None else mmap)
+        self.store = ChunkStore(self.index_path + ".chunks")
+        self.pending = {}
+        self.removed = set()
+        self.tombstones = self.store.tombstones()
+        self.lexical = LexicalIndex.load(self.index_path + ".lexical") if os.path.exists(self.index_path + ".lexical") else None
+        self.symbols = SymbolTable.load(self.index_path + ".symbols") if os.path.exists(self.index_path + ".symbols") else None
         
         print(f"Loaded FAISS index from: {self.index_path}")
-        print(f"Total vectors: {self.index.ntotal}")
+        print(f"Total vectors: {data['count']}")
         print(f"Vector dimension: {self.vector_dim}")
+        print(f"Index type: {self.index_type} ({self.metric})")
+        if self.model_info:
+            print(f"Embedding model: {self.model_info['name']}")
+        if self.reduction:
+            print(f"Stored dimension: {self.reduction['dim']} ({self.reduction['method']})")
+        if self.mmapped:
+            print("Index memory-mapped read-only")
+
+    def _read_index(self, mmap):
+        import faiss
+
+        self.mmapped = False
+        if mmap:
+            try:
+                index = faiss.read_index(self.index_path, mmap_flags(self.index_type))
+                self.mmapped = True
+                return index
+            except RuntimeError as exc:
+                print(f"Memory-mapped load not supported for this index, reading into memory: {exc}")
+        return faiss.read_index(self.index_path)
+
+
+def _replace_synced(tmp_path, path):
+    fd = os.open(tmp_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+
+def write_meta(path, data):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    _replace_synced(path + ".tmp", path)
+
+
+def migrate_legacy_metadata(index_path):
+    import faiss
+
+    meta_path = index_path + ".meta"
+    with open(meta_path, "rb") as f:
+        header = f.read()
+
+    if header.startswith(b"\x80"):
+        data = pickle.loads(header)
+        metadata = data["metadata"]
+    else:
+        data = json.loads(header)
+        metadata = [chunk for _, chunk in ChunkStore(index_path + ".chunks").iter_rows()]
+
+    # Older indexes address vectors by position; rebuild them under stable chunk ids.
+    old_index = faiss.read_index(index_path)
+    vectors = old_index.reconstruct_n(0, old_index.ntotal)
+
+    faiss_index = FaissIndex(
+        index_path=index_path,
+        model_info=data.get("model_info"),
+        reduce_dim=(data.get("reduction") or {}).get("dim"),
+        reduction=(data.get("reduction") or {}).get("method", "pca"),
+        index_type=data.get("index_type", "flat"),
+        build_params=data.get("build_params"),
+        metric=data.get("metric", "l2"),
+    )
+    faiss_index.add([dict(chunk, vector=vector) for chunk, vector in zip(metadata, vectors)])
+    faiss_index.save()
+
+    print(f"Migrated {len(metadata)} chunks to: {index_path}.chunks")
 
 
 if __name__ == "__main__":
     import argparse
     sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embeddings"))
-    from embedder import create_embeddings
+    from embedder import MODEL_NAME, create_embeddings, embed_texts
+    from model_registry import model_fingerprint
     
     sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "chunking"))
     from chunker import chunk_repo
+    from code_search import CodeSearchIndex
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reasoning"))
+    from overview_signals import build_repo_profile
 
     parser = argparse.ArgumentParser(description="Build FAISS index from repo chunks.")
     parser.add_argument(
@@ -118,8 +695,23 @@ if __name__ == "__main__":
         nargs="?",
         help="Path to temp folder (defaults to latest repopilot_* in Backend/data/repo_temp)",
     )
+    parser.add_argument("--model", default=MODEL_NAME, help=f"Embedding model name (default: {MODEL_NAME})")
+    parser.add_argument("--reduce-dim", type=int, help="Store vectors reduced to this dimension")
+    parser.add_argument("--reduction", default="pca", choices=REDUCTION_METHODS, help="Reduction method (default: pca)")
+    parser.add_argument("--index-type", default="auto", choices=INDEX_TYPES, help="FAISS index type (default: auto)")
+    parser.add_argument("--metric", default="l2", choices=METRICS, help="Distance metric (default: l2)")
+    parser.add_argument("--shards", type=int, default=1, help="Split the index into this many shards (default: 1)")
+    parser.add_argument("--shard-by", default="path_hash", choices=("path_hash", "top_dir"), help="Shard routing: path_hash or top_dir (default: path_hash)")
+    parser.add_argument("--migrate", metavar="INDEX_PATH", help="Convert an index saved in an older format and exit")
     args = parser.parse_args()
 
+    if args.shards > 1 and args.reduce_dim:
+        parser.error("--shards cannot be combined with --reduce-dim")
+
+    if args.migrate:
+        migrate_legacy_metadata(args.migrate)
+        sys.exit(0)
+
     print("=" * 80)
     print("FAISS Index Builder - Full Pipeline")
     print("=" * 80)
@@ -129,17 +721,38 @@ if __name__ == "__main__":
     print(f"✓ Loaded {len(chunks)} chunks")
 
     print("\nStep 2: Generating embeddings...")
-    embedded_chunks = create_embeddings(chunks)
+    embedded_chunks = create_embeddings(chunks, model_name=args.model)
     print(f"✓ Generated embeddings for {len(embedded_chunks)} chunks")
 
     print("\nStep 3: Building FAISS index...")
-    faiss_index = FaissIndex()
+    index_options = {
+        "model_info": model_fingerprint(args.model),
+        "reduce_dim": args.reduce_dim,
+        "reduction": args.reduction,
+        "index_type": args.index_type,
+        "metric": args.metric,
+    }
+    if args.shards > 1:
+        from sharded_index import ShardedFaissIndex
+
+        faiss_index = ShardedFaissIndex(num_shards=args.shards, shard_by=args.shard_by, **index_options)
+    else:
+        faiss_index = FaissIndex(**index_options)
+    faiss_index.profile = build_repo_profile(chunks)
+    faiss_index.calibration_vectors = embed_texts(calibration_questions(chunks), show_progress_bar=False, model_name=args.model)
     faiss_index.add(embedded_chunks)
     print(f"✓ Built FAISS index")
 
     print("\nStep 4: Saving index to disk...")
     faiss_index.save()
     print(f"✓ Index saved successfully")
+
+    if args.temp_folder_path:
+        print("\nStep 5: Building trigram code search index...")
+        CodeSearchIndex.build(faiss_index.index_path, args.temp_folder_path, {chunk["file"] for chunk in chunks})
+        print(f"✓ Code search index saved")
+    else:
+        print("\nStep 5: Skipped code search index (pass temp_folder_path to build it)")
     
     print("\n" + "=" * 80)
     print("Pipeline complete!")
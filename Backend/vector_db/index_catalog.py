@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    from .index_versions import current_index_path, current_version, new_version, publish_version
+except ImportError:
+    from index_versions import current_index_path, current_version, new_version, publish_version
+
+CATALOG_FILE = "catalog.json"
+
+
+class UnknownRepoError(LookupError):
+    pass
+
+
+def repo_key(owner, repo, ref):
+    return f"{owner}/{repo}@{ref}"
+
+
+def _safe_segment(value):
+    return re.sub(r"[^A-Za-z0-9._-]+", "__", value)
+
+
+class IndexCatalog:
+    def __init__(self, root_dir=None):
+        if root_dir is None:
+            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            root_dir = os.path.join(backend_dir, "data", "vector_store")
+
+        self.root_dir = root_dir
+        self.registry_path = os.path.join(root_dir, CATALOG_FILE)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._mtime = None
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.registry_path)
+        except FileNotFoundError:
+            self._entries, self._mtime = {}, None
+            return self._entries
+
+        if mtime != self._mtime:
+            with open(self.registry_path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f).get("repos", {})
+            self._mtime = mtime
+        return self._entries
+
+    def entries(self):
+        with self._lock:
+            return dict(self._load())
+
+    def index_dir(self, key):
+        owner_repo, _, ref = key.partition("@")
+        owner, _, repo = owner_repo.partition("/")
+        return os.path.join(self.root_dir, "repos", _safe_segment(owner), _safe_segment(repo), _safe_segment(ref))
+
+    def index_path(self, key):
+        index_dir = self.index_dir(key)
+        legacy_path = os.path.join(index_dir, "index.faiss")
+        if current_version(index_dir) is None and os.path.exists(legacy_path):
+            return legacy_path
+        return current_index_path(index_dir)
+
+    def new_version(self, key):
+        return new_version(self.index_dir(key))
+
+    def publish(self, key, version):
+        publish_version(self.index_dir(key), version)
+
+    def register(self, key, info):
+        with self._lock:
+            entries = dict(self._load())
+            entries[key] = dict(
+                info,
+                index_dir=os.path.relpath(self.index_dir(key), self.root_dir),
+                indexed_at=time.time(),
+            )
+
+            os.makedirs(self.root_dir, exist_ok=True)
+            tmp_path = self.registry_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"repos": entries}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.registry_path)
+
+            self._entries = entries
+            self._mtime = os.path.getmtime(self.registry_path)
+            return entries[key]
+
+    def resolve(self, repo=None):
+        entries = self.entries()
+        if not entries:
+            raise UnknownRepoError("No repositories have been indexed yet")
+
+        if not repo:
+            return max(entries, key=lambda k: entries[k]["indexed_at"])
+
+        repo = repo.strip()
+        match = re.match(r"^https?://github\.com/([^/]+)/([^/#@]+)", repo)
+        if match:
+            name = match.group(2)
+            repo = f"{match.group(1)}/{name[:-4] if name.endswith('.git') else name}"
+
+        if repo in entries:
+            return repo
+
+        candidates = [k for k in entries if k.partition("@")[0] == repo]
+        if not candidates:
+            raise UnknownRepoError(f"Repository not indexed: {repo}")
+        return max(candidates, key=lambda k: entries[k]["indexed_at"])
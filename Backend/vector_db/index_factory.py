@@ -0,0 +1,147 @@
+import math
+
+import numpy as np
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf_flat", "ivf_pq")
+METRICS = ("l2", "cosine")
+
+HNSW_MIN_VECTORS = 20000
+IVF_MIN_VECTORS = 1000000
+IVF_PQ_MIN_VECTORS = 5000000
+TRAIN_SAMPLE_SIZE = 100000
+
+DEFAULT_BUILD_PARAMS = {
+    "flat": {},
+    "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 64},
+    "ivf_flat": {"nlist": None, "nprobe": 16},
+    "ivf_pq": {"nlist": None, "pq_m": None, "pq_nbits": 8, "nprobe": 16},
+}
+
+
+def choose_index_type(ntotal):
+    if ntotal < HNSW_MIN_VECTORS:
+        return "flat"
+    if ntotal < IVF_MIN_VECTORS:
+        return "hnsw"
+    if ntotal < IVF_PQ_MIN_VECTORS:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def resolve_build_params(index_type, dim, ntotal, params=None):
+    if index_type == "auto":
+        index_type = choose_index_type(ntotal)
+
+    if index_type not in DEFAULT_BUILD_PARAMS:
+        raise ValueError(f"Unknown index type: {index_type}. Use one of {INDEX_TYPES}")
+
+    resolved = dict(DEFAULT_BUILD_PARAMS[index_type])
+    resolved.update({k: v for k, v in (params or {}).items() if v is not None})
+
+    if "nlist" in resolved and not resolved["nlist"]:
+        resolved["nlist"] = max(1, min(int(4 * math.sqrt(ntotal)), ntotal // 39))
+
+    if index_type == "ivf_pq":
+        if not resolved["pq_m"]:
+            resolved["pq_m"] = max(m for m in range(1, dim // 8 + 1) if dim % m == 0) if dim >= 8 else 1
+        if dim % resolved["pq_m"] != 0:
+            raise ValueError(f"pq_m ({resolved['pq_m']}) must divide the vector dimension ({dim})")
+        resolved["pq_nbits"] = max(1, min(resolved["pq_nbits"], int(math.log2(max(ntotal // 39, 2)))))
+
+    return index_type, resolved
+
+
+def create_index(index_type, dim, params, metric="l2"):
+    import faiss
+
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}. Use one of {METRICS}")
+
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+    if index_type == "flat":
+        return faiss.IndexFlat(dim, faiss_metric)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, params["m"], faiss_metric)
+        index.hnsw.efConstruction = params["ef_construction"]
+        index.hnsw.efSearch = params["ef_search"]
+        return index
+
+    quantizer = faiss.IndexFlat(dim, faiss_metric)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"], faiss_metric)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["pq_m"], params["pq_nbits"], faiss_metric)
+    index.nprobe = params["nprobe"]
+    return index
+
+
+def training_sample(vectors, max_size=TRAIN_SAMPLE_SIZE):
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    if len(vectors) <= max_size:
+        return vectors
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(vectors), size=max_size, replace=False)
+    return vectors[np.sort(rows)]
+
+
+def with_stable_ids(index):
+    import faiss
+
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+
+    if ivf is not None:
+        # IVF indexes store external ids natively; a hashtable direct map keeps
+        # reconstruct() and remove_ids() working with arbitrary 64-bit ids.
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+
+    return faiss.IndexIDMap2(index)
+
+
+def mmap_flags(index_type):
+    import faiss
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        flags = faiss.IO_FLAG_MMAP
+    else:
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    return flags | faiss.IO_FLAG_READ_ONLY
+
+
+def _base_index(index):
+    import faiss
+
+    index = faiss.downcast_index(index)
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexPreTransform)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def search_parameters(index, nprobe=None, ef_search=None, sel=None):
+    import faiss
+
+    if nprobe is None and ef_search is None and sel is None:
+        return None
+
+    # Wrappers (IndexIDMap2, IndexPreTransform) forward parameters to the index
+    # they wrap, so the parameter object has to match the innermost index type.
+    base = _base_index(index)
+
+    if isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = int(ef_search) if ef_search is not None else base.hnsw.efSearch
+    elif isinstance(base, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = int(nprobe) if nprobe is not None else base.nprobe
+    else:
+        params = faiss.SearchParameters()
+
+    if sel is not None:
+        params.sel = sel
+        params.referenced_objects = [sel]
+    return params
@@ -0,0 +1,76 @@
+import os
+import shutil
+import time
+import uuid
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+INDEX_FILE = "index.faiss"
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "3"))
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def new_version(index_dir):
+    now = time.time()
+    # Names sort chronologically, which is what prune_versions relies on
+    version = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:8]}"
+    version_dir = os.path.join(index_dir, VERSIONS_DIR, version)
+    os.makedirs(version_dir)
+    return version, os.path.join(version_dir, INDEX_FILE)
+
+
+def current_version(index_dir):
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_index_path(index_dir):
+    version = current_version(index_dir)
+    if version is None:
+        raise FileNotFoundError(f"No published index version in: {index_dir}")
+    return os.path.join(index_dir, VERSIONS_DIR, version, INDEX_FILE)
+
+
+def publish_version(index_dir, version, keep=INDEX_KEEP_VERSIONS):
+    version_dir = os.path.join(index_dir, VERSIONS_DIR, version)
+    if not os.path.exists(os.path.join(version_dir, INDEX_FILE + ".meta")):
+        raise FileNotFoundError(f"Index version was not saved: {version_dir}")
+
+    for name in os.listdir(version_dir):
+        _fsync_path(os.path.join(version_dir, name))
+    _fsync_path(version_dir)
+
+    pointer = os.path.join(index_dir, CURRENT_FILE)
+    tmp_pointer = f"{pointer}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+    _fsync_path(index_dir)
+
+    prune_versions(index_dir, keep)
+
+
+def prune_versions(index_dir, keep=INDEX_KEEP_VERSIONS):
+    versions_root = os.path.join(index_dir, VERSIONS_DIR)
+    current = current_version(index_dir)
+    versions = sorted(os.listdir(versions_root), reverse=True)
+
+    # Readers that already loaded an old version keep working on POSIX: unlinked files
+    # stay readable (and mmapped) until the last handle is closed. This holds because
+    # loading opens every file of a version up front (FAISS index, chunk store and code
+    # search store) instead of on first use from a request thread.
+    for version in versions[keep:]:
+        if version != current:
+            shutil.rmtree(os.path.join(versions_root, version), ignore_errors=True)
@@ -0,0 +1,170 @@
+import math
+import os
+import re
+import shutil
+from collections import Counter
+
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_TOKEN_LENGTH = 64
+
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def identifier_tokens(text):
+    # "_get_repo_tree" -> get_repo_tree, get, repo, tree
+    # "SafetyCheck"    -> safetycheck, safety, check
+    tokens = []
+    for word in _WORD.findall(text or ""):
+        word = word.strip("_")
+        if not word or len(word) > MAX_TOKEN_LENGTH:
+            continue
+        tokens.append(word.lower())
+        parts = [part.lower() for piece in word.split("_") for part in _CAMEL_PART.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def _chunk_tokens(chunk):
+    return identifier_tokens(" ".join(
+        value for value in (chunk.get("file"), chunk.get("symbol_name"), chunk.get("text")) if value
+    ))
+
+
+_ARRAYS = ("term_bytes", "term_offsets", "offsets", "postings", "freqs", "doc_ids", "doc_lengths")
+
+
+class LexicalIndex:
+    # Every array is saved as its own .npy and memory-mapped on load, so workers share one
+    # page-cached copy; the vocabulary is a UTF-8 blob sliced by term_offsets, in byte order
+    def __init__(self, term_bytes, term_offsets, offsets, postings, freqs, doc_ids, doc_lengths):
+        self.term_bytes = term_bytes
+        self.term_offsets = term_offsets
+        self.offsets = offsets
+        self.postings = postings
+        self.freqs = freqs
+        self.doc_ids = doc_ids
+        self.doc_lengths = doc_lengths
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @staticmethod
+    def _encode_terms(terms):
+        encoded = [term.encode("utf-8") for term in terms]
+        term_offsets = np.zeros(len(encoded) + 1, dtype="int64")
+        term_offsets[1:] = np.cumsum([len(term) for term in encoded])
+        return np.frombuffer(b"".join(encoded), dtype="uint8"), term_offsets
+
+    @classmethod
+    def build(cls, rows):
+        doc_ids = []
+        doc_lengths = []
+        term_postings = {}
+
+        for position, (uid, chunk) in enumerate(rows):
+            counts = Counter(_chunk_tokens(chunk))
+            doc_ids.append(uid)
+            doc_lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                term_postings.setdefault(term, []).append((position, count))
+
+        # Postings for all terms live in two flat arrays; a term's slice is
+        # offsets[i]:offsets[i + 1] in sorted vocabulary order.
+        # Code point order, which is also the UTF-8 byte order _term_position searches in
+        terms = sorted(term_postings)
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        postings = []
+        freqs = []
+        for i, term in enumerate(terms):
+            entries = term_postings[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            postings.extend(position for position, _ in entries)
+            freqs.extend(min(count, 65535) for _, count in entries)
+
+        return cls(
+            *cls._encode_terms(terms),
+            offsets,
+            np.array(postings, dtype="int32"),
+            np.array(freqs, dtype="uint16"),
+            np.array(doc_ids, dtype="int64"),
+            np.array(doc_lengths, dtype="int32"),
+        )
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _term(self, i):
+        return self.term_bytes[self.term_offsets[i]:self.term_offsets[i + 1]].tobytes()
+
+    def _term_position(self, term):
+        key = term.encode("utf-8")
+        low, high = 0, len(self.term_offsets) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if self._term(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(self.term_offsets) - 1 and self._term(low) == key:
+            return low
+        return None
+
+    def search(self, text, top_k=10, allowed=None):
+        if not len(self.doc_ids):
+            return []
+
+        scores = np.zeros(len(self.doc_ids), dtype="float32")
+        for term in set(identifier_tokens(text)):
+            i = self._term_position(term)
+            if i is None:
+                continue
+
+            start, end = self.offsets[i], self.offsets[i + 1]
+            docs = self.postings[start:end]
+            tf = self.freqs[start:end].astype("float32")
+            idf = math.log(1 + (len(self.doc_ids) - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += idf * tf * (BM25_K1 + 1) / norm
+
+        if allowed is not None:
+            scores[~np.isin(self.doc_ids, allowed)] = 0
+
+        candidates = np.nonzero(scores)[0]
+        top = candidates[np.argsort(-scores[candidates], kind="stable")[:top_k]]
+        return [(int(self.doc_ids[p]), float(scores[p])) for p in top]
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in _ARRAYS:
+            with open(os.path.join(tmp_path, name + ".npy"), "wb") as f:
+                np.save(f, np.asarray(getattr(self, name)))
+                f.flush()
+                os.fsync(f.fileno())
+
+        # Swap whole directories: readers keep the arrays they already mapped from the old one
+        if os.path.isdir(path):
+            old_path = path + ".old"
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            if os.path.exists(path):
+                os.remove(path)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        if os.path.isfile(path):
+            # Saved as a single .npz before the arrays were memory-mapped
+            with np.load(path) as data:
+                return cls(
+                    *cls._encode_terms(data["terms"].tolist()),
+                    *(data[name] for name in _ARRAYS[2:]),
+                )
+        return cls(*(np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in _ARRAYS))
@@ -0,0 +1,105 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+try:
+    from .index_factory import training_sample
+except ImportError:
+    from index_factory import training_sample
+
+REDUCTION_METHODS = ("pca", "matryoshka")
+
+
+def build_reducer(method, input_dim, output_dim, training_vectors=None):
+    import faiss
+
+    if method not in REDUCTION_METHODS:
+        raise ValueError(f"Unknown reduction method: {method}. Use one of {REDUCTION_METHODS}")
+
+    if not 0 < output_dim < input_dim:
+        raise ValueError(f"Reduced dimension must be between 1 and {input_dim - 1}, got {output_dim}")
+
+    if method == "matryoshka":
+        return faiss.RemapDimensionsTransform(input_dim, output_dim, False)
+
+    if training_vectors is None or len(training_vectors) < output_dim:
+        raise ValueError(f"PCA to {output_dim} dimensions needs at least {output_dim} training vectors")
+
+    transform = faiss.PCAMatrix(input_dim, output_dim)
+    transform.train(training_sample(training_vectors))
+    return transform
+
+
+def reduction_report(vectors, dims, method="pca", top_k=10, num_queries=200):
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    total, input_dim = vectors.shape
+    if total <= top_k:
+        raise ValueError(f"Need more than {top_k} vectors to measure recall")
+
+    rng = np.random.default_rng(0)
+    query_ids = rng.choice(total, size=min(num_queries, total), replace=False)
+    queries = vectors[query_ids]
+
+    exact = faiss.IndexFlatL2(input_dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, top_k + 1)
+    truth = [set(row) - {qid} for row, qid in zip(truth, query_ids)]
+
+    rows = []
+    for dim in sorted(set(dims) | {input_dim}, reverse=True):
+        if dim == input_dim:
+            index = exact
+        else:
+            index = faiss.IndexPreTransform(
+                build_reducer(method, input_dim, dim, vectors),
+                faiss.IndexFlatL2(dim),
+            )
+            index.add(vectors)
+
+        start = time.perf_counter()
+        _, found = index.search(queries, top_k + 1)
+        elapsed = time.perf_counter() - start
+
+        hits = sum(len(t & (set(row) - {qid})) for t, row, qid in zip(truth, found, query_ids))
+        rows.append({
+            "dim": dim,
+            "recall": round(hits / sum(len(t) for t in truth), 4),
+            "bytes_per_vector": dim * 4,
+            "search_ms_per_query": round(elapsed * 1000 / len(queries), 4),
+        })
+
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from sharded_index import load_index
+
+    parser = argparse.ArgumentParser(description="Report recall versus reduced vector dimension.")
+    parser.add_argument("--index-path", help="Path to a full-dimension FAISS index")
+    parser.add_argument("--dims", default="256,192,128,64", help="Comma separated target dimensions")
+    parser.add_argument("--method", default="pca", choices=REDUCTION_METHODS)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    faiss_index = load_index(args.index_path)
+    vectors = faiss_index.reconstruct(faiss_index.live_ids())
+
+    report = reduction_report(
+        vectors,
+        [int(d) for d in args.dims.split(",")],
+        method=args.method,
+        top_k=args.top_k,
+        num_queries=args.queries,
+    )
+
+    print(f"\n{'dim':>6} {'recall@' + str(args.top_k):>10} {'bytes/vec':>10} {'ms/query':>10}")
+    for row in report:
+        print(f"{row['dim']:>6} {row['recall']:>10.4f} {row['bytes_per_vector']:>10} {row['search_ms_per_query']:>10.4f}")
@@ -0,0 +1,129 @@
+import os
+import re
+
+FILTER_FIELDS = ("path", "name", "lang", "type", "symbol")
+
+LANGUAGE_EXTENSIONS = {
+    "python": (".py",),
+    "py": (".py",),
+    "javascript": (".js", ".jsx", ".mjs", ".cjs"),
+    "js": (".js", ".jsx", ".mjs", ".cjs"),
+    "typescript": (".ts", ".tsx"),
+    "ts": (".ts", ".tsx"),
+    "java": (".java",),
+    "c": (".c", ".h"),
+    "cpp": (".cpp", ".cc", ".cxx", ".hpp", ".hh", ".h"),
+    "c++": (".cpp", ".cc", ".cxx", ".hpp", ".hh", ".h"),
+    "csharp": (".cs",),
+    "cs": (".cs",),
+    "go": (".go",),
+    "rust": (".rs",),
+    "ruby": (".rb",),
+    "markdown": (".md",),
+    "md": (".md",),
+    "json": (".json",),
+    "yaml": (".yml", ".yaml"),
+    "html": (".html", ".htm"),
+    "css": (".css", ".scss"),
+}
+
+_FILTER_PATTERN = re.compile(r"(?:^|\s)(path|name|lang|type|symbol):(\S+)", re.IGNORECASE)
+
+
+def file_extension(path):
+    return os.path.splitext(path)[1].lower()
+
+
+def _values(value):
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ValueError("Filter values must be a string or a list of strings")
+    return [v.strip() for v in value if v and v.strip()]
+
+
+def merge_filters(filters, extra):
+    # Inline "lang:py" filters plus the request's {"lang": "py"} / {"lang": ["py", "js"]}
+    if extra is None:
+        return filters
+    if not isinstance(extra, dict):
+        raise ValueError("filters must be an object mapping a field to a string or a list of strings")
+
+    merged = {field: list(values) for field, values in filters.items()}
+    for field, value in extra.items():
+        merged.setdefault(field, []).extend(_values(value))
+    return merged
+
+
+def normalize_filters(filters):
+    # {"path", "lang", "type", "symbol"} from the API -> chunk store columns
+    if not filters:
+        return None
+
+    unknown = set(filters) - set(FILTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown filter field(s): {', '.join(sorted(unknown))}. Use one of: {', '.join(FILTER_FIELDS)}")
+
+    normalized = {}
+
+    paths = []
+    for path in _values(filters.get("path", [])):
+        path = path.replace("\\", "/")
+        while path.startswith("./"):
+            path = path[2:]
+        path = path.lstrip("/")
+        if path:
+            paths.append(path.replace("/", os.sep))
+    if paths:
+        normalized["path"] = tuple(paths)
+
+    # File name prefixes, matched in any directory: "readme" finds frontend/README.md
+    names = [name.lower() for name in _values(filters.get("name", []))]
+    if names:
+        normalized["name"] = tuple(names)
+
+    extensions = []
+    for lang in _values(filters.get("lang", [])):
+        lang = lang.lower()
+        extensions.extend(LANGUAGE_EXTENSIONS.get(lang, ("." + lang.lstrip("."),)))
+    if extensions:
+        normalized["extension"] = tuple(dict.fromkeys(extensions))
+
+    chunk_types = [t.lower() for t in _values(filters.get("type", []))]
+    if chunk_types:
+        normalized["chunk_type"] = tuple(chunk_types)
+
+    symbols = _values(filters.get("symbol", []))
+    if symbols:
+        normalized["symbol_name"] = tuple(symbols)
+
+    return normalized or None
+
+
+def parse_filter_query(question):
+    # "how are pdfs parsed? path:backend/services lang:python"
+    filters = {}
+    for field, value in _FILTER_PATTERN.findall(question):
+        filters.setdefault(field.lower(), []).extend(_values(value))
+
+    cleaned = " ".join(_FILTER_PATTERN.sub(" ", question).split())
+    return cleaned, filters
+
+
+def file_name_matches(path, names):
+    return os.path.basename(path.replace("\\", "/")).lower().startswith(names)
+
+
+def chunk_matches(chunk, filters):
+    file_path = chunk.get("file") or ""
+    if "path" in filters and not file_path.startswith(filters["path"]):
+        return False
+    if "name" in filters and not file_name_matches(file_path, filters["name"]):
+        return False
+    if "extension" in filters and file_extension(file_path) not in filters["extension"]:
+        return False
+    if "chunk_type" in filters and chunk.get("chunk_type") not in filters["chunk_type"]:
+        return False
+    if "symbol_name" in filters and chunk.get("symbol_name") not in filters["symbol_name"]:
+        return False
+    return True
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import numpy as np
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .faiss_index import METADATA_FORMAT_VERSION, FaissIndex, compute_score_stats, write_meta
+    from .search_filters import normalize_filters
+except ImportError:
+    from faiss_index import METADATA_FORMAT_VERSION, FaissIndex, compute_score_stats, write_meta
+    from search_filters import normalize_filters
+
+SHARD_STRATEGIES = ("path_hash", "top_dir")
+INDEX_SHARD_WORKERS = int(os.getenv("INDEX_SHARD_WORKERS", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _shard_executor():
+    # One pool for every sharded index in the process; hot-swapped indexes share it too
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=INDEX_SHARD_WORKERS, thread_name_prefix="faiss-shard")
+    return _executor
+
+
+def shard_for(file, num_shards, shard_by="path_hash"):
+    if shard_by not in SHARD_STRATEGIES:
+        raise ValueError(f"Unsupported shard strategy: {shard_by}. Use one of: {', '.join(SHARD_STRATEGIES)}")
+
+    key = file.replace("\\", "/")
+    if shard_by == "top_dir":
+        # Keeps each top-level directory in one shard, so path filters can skip the rest
+        key = key.split("/", 1)[0] if "/" in key else ""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % num_shards
+
+
+def load_index(index_path, mmap=None):
+    with open(index_path + ".meta", "rb") as f:
+        header = f.read()
+
+    if header.startswith(b"{") and json.loads(header).get("sharded"):
+        faiss_index = ShardedFaissIndex(index_path=index_path)
+    else:
+        faiss_index = FaissIndex(index_path=index_path)
+    faiss_index.load(mmap=mmap)
+    return faiss_index
+
+
+class ShardedFaissIndex:
+    def __init__(
+        self,
+        num_shards=None,
+        index_path=None,
+        shard_by="path_hash",
+        model_info=None,
+        metric="l2",
+        **index_kwargs,
+    ):
+        if shard_by not in SHARD_STRATEGIES:
+            raise ValueError(f"Unsupported shard strategy: {shard_by}. Use one of: {', '.join(SHARD_STRATEGIES)}")
+        if num_shards is not None and num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        if index_kwargs.get("reduce_dim"):
+            # Each shard would train its own projection, and distances from different
+            # projections cannot be merged into one ranking
+            raise ValueError("Sharded indexes do not support dimension reduction. Use one shard or drop reduce_dim.")
+
+        if index_path is None:
+            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            index_path = os.path.join(backend_dir, "data", "vector_store", "index.faiss")
+
+        self.index_path = index_path
+        self.shard_by = shard_by
+        self.model_info = model_info
+        self.metric = metric
+        self.index_kwargs = index_kwargs
+        self.vector_dim = None
+        self.score_stats = None
+        self.profile = None
+        self.calibration_vectors = None
+        self.shards = [self._new_shard(i) for i in range(num_shards or 0)]
+
+    def _shard_path(self, i):
+        return f"{self.index_path}.shard-{i:03d}"
+
+    def _new_shard(self, i):
+        return FaissIndex(
+            index_path=self._shard_path(i),
+            model_info=self.model_info,
+            metric=self.metric,
+            **self.index_kwargs,
+        )
+
+    @property
+    def num_shards(self):
+        return len(self.shards)
+
+    @property
+    def ntotal(self):
+        return sum(shard.ntotal for shard in self.shards)
+
+    @property
+    def mmapped(self):
+        return any(shard.mmapped for shard in self.shards)
+
+    @property
+    def index_type(self):
+        types = {shard.index_type for shard in self.shards if shard.index is not None}
+        return types.pop() if len(types) == 1 else sorted(types)
+
+    def _map(self, fn, shards):
+        shards = list(shards)
+        if len(shards) <= 1:
+            return [fn(shard) for shard in shards]
+        return list(_shard_executor().map(fn, shards))
+
+    def _group_by_shard(self, embedded_chunks):
+        groups = {}
+        for chunk in embedded_chunks:
+            groups.setdefault(shard_for(chunk["file"], self.num_shards, self.shard_by), []).append(chunk)
+        return groups
+
+    def add(self, embedded_chunks):
+        if not embedded_chunks:
+            raise ValueError("embedded_chunks cannot be empty")
+
+        groups = self._group_by_shard(embedded_chunks)
+        # FAISS releases the GIL while training and adding, so shards build in parallel
+        self._map(lambda i: self.shards[i].add(groups[i]), groups)
+        self.vector_dim = len(embedded_chunks[0]["vector"])
+
+    def remove_files(self, files):
+        groups = {}
+        for file in set(files):
+            groups.setdefault(shard_for(file, self.num_shards, self.shard_by), []).append(file)
+        return sum(self.shards[i].remove_files(group) for i, group in groups.items() if self.shards[i].index is not None)
+
+    def remove_by_file(self, file):
+        return self.remove_files([file])
+
+    def upsert_chunks(self, embedded_chunks):
+        if not embedded_chunks:
+            raise ValueError("embedded_chunks cannot be empty")
+
+        removed = self.remove_files({chunk["file"] for chunk in embedded_chunks})
+        self.add(embedded_chunks)
+        return {"removed": removed, "added": len(embedded_chunks)}
+
+    def live_ids(self):
+        return np.concatenate([shard.live_ids() for shard in self.shards if shard.index is not None])
+
+    def reconstruct(self, ids):
+        ids = [int(i) for i in ids]
+        vectors = {}
+        for shard in self.shards:
+            if shard.index is None:
+                continue
+            owned = sorted(shard._live_ids(uid for uid in ids if uid not in vectors))
+            if owned:
+                vectors.update(zip(owned, shard.reconstruct(owned)))
+        missing = [uid for uid in ids if uid not in vectors]
+        if missing:
+            raise KeyError(f"{len(missing)} id(s) are not in any shard")
+        return np.stack([vectors[uid] for uid in ids])
+
+    def _shards_for_filters(self, filters):
+        searchable = [shard for shard in self.shards if shard.ntotal > 0]
+        prefixes = (normalize_filters(filters) or {}).get("path")
+        if self.shard_by != "top_dir" or not prefixes:
+            return searchable
+
+        prefixes = [p.replace("\\", "/") for p in prefixes]
+        if not all("/" in p for p in prefixes):
+            return searchable
+
+        wanted = {shard_for(p, self.num_shards, "top_dir") for p in prefixes}
+        return [shard for i, shard in enumerate(self.shards) if i in wanted and shard.ntotal > 0]
+
+    def search(self, query_vector, top_k=5, nprobe=None, ef_search=None, filters=None):
+        return self.search_batch([query_vector], top_k=top_k, nprobe=nprobe, ef_search=ef_search, filters=filters)[0]
+
+    def search_batch(self, query_vectors, top_k=5, nprobe=None, ef_search=None, filters=None):
+        if self.ntotal == 0:
+            raise ValueError("Index is empty. Add vectors before searching.")
+
+        shards = self._shards_for_filters(filters)
+        shard_results = self._map(
+            lambda shard: shard.search_batch(query_vectors, top_k=top_k, nprobe=nprobe, ef_search=ef_search, filters=filters),
+            shards,
+        )
+
+        # Every shard returns its own top-k; the global top-k is among them
+        return [
+            sorted((result for results in per_query for result in results), key=lambda r: r["distance"])[:top_k]
+            for per_query in zip(*shard_results)
+        ] if shard_results else [[] for _ in range(len(query_vectors))]
+
+    def _prepare_vectors(self, vectors):
+        return self.shards[0]._prepare_vectors(vectors)
+
+    def _distances(self, a, b):
+        return self.shards[0]._distances(a, b)
+
+    def _search_ids(self, vectors, top_k):
+        shard_rows = self._map(lambda shard: shard._search_ids(vectors, top_k), [s for s in self.shards if s.ntotal > 0])
+        return [
+            sorted((hit for rows in per_query for hit in rows), key=lambda hit: hit[1])[:top_k]
+            for per_query in zip(*shard_rows)
+        ]
+
+    def lexical_search(self, question, query_vector, top_k=5, filters=None):
+        shard_results = self._map(
+            lambda shard: shard.lexical_search(question, query_vector, top_k=top_k, filters=filters),
+            self._shards_for_filters(filters),
+        )
+        # BM25 statistics are per shard; with hash routing they stay comparable
+        merged = [result for results in shard_results for result in results]
+        return sorted(merged, key=lambda r: -r["lexical_score"])[:top_k]
+
+    def symbol_search(self, question, top_k=5, filters=None):
+        results = [
+            result
+            for shard_results in self._map(lambda shard: shard.symbol_search(question, top_k=top_k, filters=filters), self.shards)
+            for result in shard_results
+        ]
+        # Exact definitions from any shard beat fuzzy ones from another
+        exact = [result for result in results if result["symbol_match"] == "exact"]
+        return (exact or results)[:top_k]
+
+    def find_symbols(self, query, mode="exact", limit=20):
+        symbols = [symbol for shard in self.shards for symbol in shard.find_symbols(query, mode=mode, limit=limit)]
+        if mode == "prefix":
+            symbols.sort(key=lambda symbol: symbol["symbol_name"].lower())
+        return symbols[:limit]
+
+    def neighbor_chunks(self, file, chunk_id, radius=1):
+        return self.shards[shard_for(file, self.num_shards, self.shard_by)].neighbor_chunks(file, chunk_id, radius)
+
+    def enclosing_chunk(self, file, chunk_id, start_line, end_line):
+        shard = self.shards[shard_for(file, self.num_shards, self.shard_by)]
+        return shard.enclosing_chunk(file, chunk_id, start_line, end_line)
+
+    def save(self):
+        if self.ntotal == 0:
+            raise ValueError("Cannot save empty index")
+
+        self._map(lambda shard: shard.save(), [shard for shard in self.shards if shard.index is not None])
+        # Calibrated on the merged scatter-gather results, the same rankings queries see
+        self.score_stats = compute_score_stats(self)
+
+        write_meta(self.index_path + ".meta", {
+            "format_version": METADATA_FORMAT_VERSION,
+            "sharded": True,
+            "count": self.ntotal,
+            "vector_dim": self.vector_dim,
+            "model_info": self.model_info,
+            "metric": self.metric,
+            "shard_by": self.shard_by,
+            "shards": [
+                os.path.basename(shard.index_path) if shard.index is not None else None
+                for shard in self.shards
+            ],
+            "score_stats": self.score_stats,
+            "profile": self.profile,
+        })
+
+        print(f"Saved {self.num_shards} FAISS index shards to: {self.index_path}")
+
+    def load(self, mmap=None):
+        meta_path = self.index_path + ".meta"
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Metadata file not found: {meta_path}")
+
+        with open(meta_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not data.get("sharded"):
+            raise ValueError(f"{self.index_path} is not a sharded index")
+
+        self.vector_dim = data["vector_dim"]
+        self.model_info = data.get("model_info")
+        self.metric = data.get("metric", "l2")
+        self.shard_by = data.get("shard_by", "path_hash")
+        self.score_stats = data.get("score_stats")
+        self.profile = data.get("profile")
+        self.shards = [self._new_shard(i) for i in range(len(data["shards"]))]
+
+        self._map(
+            lambda shard: shard.load(mmap=mmap),
+            [shard for shard, name in zip(self.shards, data["shards"]) if name is not None],
+        )
+        print(f"Loaded {self.num_shards} FAISS index shards ({data['count']} vectors) from: {self.index_path}")
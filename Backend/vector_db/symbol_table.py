@@ -0,0 +1,117 @@
+import bisect
+import difflib
+import json
+import os
+import re
+
+SYMBOL_FUZZY_CUTOFF = float(os.getenv("SYMBOL_FUZZY_CUTOFF", "0.85"))
+
+_CANDIDATE = re.compile(r"[A-Za-z_][A-Za-z0-9_.]*")
+_QUOTED = re.compile(r"`\s*([A-Za-z_][A-Za-z0-9_.]*)\s*(?:\(\))?`")
+_QUESTION_WORDS = {
+    "a", "an", "and", "are", "class", "code", "defined", "definition", "do", "does", "file", "find",
+    "for", "function", "implemented", "in", "is", "it", "locate", "located", "method", "of", "the",
+    "this", "to", "what", "where", "which",
+}
+
+
+def _looks_like_identifier(word):
+    # snake_case, camelCase, PascalCase, names with digits; not a merely capitalised "Show"
+    return "_" in word or any(c.isdigit() for c in word) or any(c.isupper() for c in word[1:])
+
+
+def symbol_candidates(question):
+    # Identifier-shaped words first: `_get_repo_tree`, `SafetyCheck`, `Retriever.retrieve`
+    candidates = []
+    for word in _CANDIDATE.findall(question):
+        word = word.strip(".").rsplit(".", 1)[-1]
+        if word and word.lower() not in _QUESTION_WORDS:
+            candidates.append(word)
+    candidates.sort(key=lambda word: not (_looks_like_identifier(word) or word[:1].isupper()))
+    return list(dict.fromkeys(candidates))
+
+
+class SymbolTable:
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self._by_lower = {}
+        for name in definitions:
+            self._by_lower.setdefault(name.lower(), []).append(name)
+        self._sorted_lower = sorted(self._by_lower)
+
+    @classmethod
+    def build(cls, rows):
+        definitions = {}
+        for uid, chunk in rows:
+            if chunk.get("symbol_name"):
+                definitions.setdefault(chunk["symbol_name"], []).append(uid)
+        return cls(definitions)
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def lookup(self, name):
+        if name in self.definitions:
+            return [name]
+        return list(self._by_lower.get(name.lower(), []))
+
+    def prefix(self, prefix, limit=20):
+        prefix = prefix.lower()
+        names = []
+        start = bisect.bisect_left(self._sorted_lower, prefix)
+        for lower in self._sorted_lower[start:]:
+            if not lower.startswith(prefix) or len(names) >= limit:
+                break
+            names.extend(self._by_lower[lower])
+        return names[:limit]
+
+    def fuzzy(self, name, limit=5, cutoff=SYMBOL_FUZZY_CUTOFF):
+        matches = difflib.get_close_matches(name.lower(), self._sorted_lower, n=limit, cutoff=cutoff)
+        return [original for lower in matches for original in self._by_lower[lower]][:limit]
+
+    def find(self, query, mode="exact", limit=20):
+        if mode == "exact":
+            return self.lookup(query)[:limit]
+        if mode == "prefix":
+            return self.prefix(query, limit)
+        if mode == "fuzzy":
+            return self.fuzzy(query, limit)
+        raise ValueError(f"Unsupported symbol lookup mode: {mode}. Use exact, prefix or fuzzy")
+
+    def resolve(self, question):
+        # Only identifier-shaped or `quoted` words are looked up. Plain English such as
+        # "config" or "load" would otherwise latch onto a symbol of the same name and be
+        # reported as an exact hit, which lets location answers skip the safety checks.
+        # A capitalised word ("Show", "Config") may just start the sentence, so it only
+        # counts when a symbol is spelled exactly that way.
+        quoted = {word.rsplit(".", 1)[-1] for word in _QUOTED.findall(question)}
+        candidates = [
+            word for word in symbol_candidates(question)
+            if _looks_like_identifier(word) or word[:1].isupper() or word in quoted
+        ]
+        for word in candidates:
+            if _looks_like_identifier(word) or word in quoted:
+                names = self.lookup(word)
+            else:
+                names = [word] if word in self.definitions else []
+            if names:
+                return names, "exact"
+
+        candidates = [word for word in candidates if _looks_like_identifier(word) or word in quoted]
+
+        for word in candidates:
+            names = self.fuzzy(word, limit=3)
+            if names:
+                return names, "fuzzy"
+        return [], None
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"definitions": self.definitions}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["definitions"])